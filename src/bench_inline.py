@@ -0,0 +1,33 @@
+import sys
+import timeit
+
+from htmlnode import scan_inline, text_to_textnodes_multipass
+
+
+def long_paragraph(sentences):
+    parts = []
+    for i in range(sentences):
+        parts.append(
+            f"Sentence {i} has **bold words**, some _italic text_, a `code span`, "
+            f"a [link to page {i}](/blog/{i}) and an ![image {i}](/images/{i}.png)."
+        )
+    return " ".join(parts)
+
+
+def main():
+    sizes = [10, 100, 1000]
+    if len(sys.argv) > 1:
+        sizes = [int(arg) for arg in sys.argv[1:]]
+
+    print(f"{'sentences':>10} {'chars':>9} {'multipass ms':>13} {'single ms':>10} {'speedup':>8}")
+    for size in sizes:
+        text = long_paragraph(size)
+        assert scan_inline(text) == text_to_textnodes_multipass(text)
+        number = max(1, 2000 // size)
+        multipass = min(timeit.repeat(lambda: text_to_textnodes_multipass(text), number=number, repeat=5)) / number
+        single = min(timeit.repeat(lambda: scan_inline(text), number=number, repeat=5)) / number
+        print(f"{size:>10} {len(text):>9} {multipass * 1000:>13.3f} {single * 1000:>10.3f} {multipass / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import htmlnode
+from htmlnode import markdown_to_html_node, text_to_textnodes
+
+
+# dict-backed copies of the node classes as they were before __slots__
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictLeafNode:
+    def __init__(self, tag, value, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
+
+
+class DictParentNode:
+    def __init__(self, tag, children, props=None):
+        self.tag = tag
+        self.children = children
+        self.props = props
+
+
+def make_document(paragraphs):
+    blocks = ["# Synthetic document"]
+    for i in range(paragraphs):
+        blocks.append(
+            f"Paragraph {i} with **bold**, _italic_, `code`, a [link](/page/{i}) "
+            f"and an ![image](/images/{i}.png) followed by plain words."
+        )
+        if i % 10 == 0:
+            blocks.append("\n".join(f"- item {j} with **weight**" for j in range(5)))
+    return "\n\n".join(blocks)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.children:
+            stack.extend(node.children)
+    return count
+
+
+def measure(mode, paragraphs):
+    if mode == "dict":
+        htmlnode.TextNode = DictTextNode
+        htmlnode.LeafNode = DictLeafNode
+        htmlnode.ParentNode = DictParentNode
+    markdown = make_document(paragraphs)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    textnode_lists = [text_to_textnodes(line) for line in markdown.split("\n\n")[1:]]
+    root = markdown_to_html_node(markdown)
+    elapsed = time.perf_counter() - start
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    html_nodes = count_nodes(root)
+    text_nodes = sum(len(nodes) for nodes in textnode_lists)
+    return {
+        "mode": mode,
+        "paragraphs": paragraphs,
+        "nodes": html_nodes + text_nodes,
+        "bytes_per_node": traced / (html_nodes + text_nodes),
+        "traced_bytes": traced,
+        "peak_traced_bytes": peak,
+        # ru_maxrss is KiB on Linux
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory used by the node classes on a large synthetic document.")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--mode", choices=["slots", "dict"], help="measure one mode in this process")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.paragraphs)))
+        return
+
+    # each mode runs in a fresh process so peak RSS is not shared between them
+    results = {}
+    for mode in ["dict", "slots"]:
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--paragraphs", str(args.paragraphs)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(output)
+
+    print(f"{'mode':>6} {'nodes':>9} {'bytes/node':>11} {'traced MiB':>11} {'peak RSS MiB':>13} {'seconds':>8}")
+    for mode in ["dict", "slots"]:
+        r = results[mode]
+        print(
+            f"{mode:>6} {r['nodes']:>9} {r['bytes_per_node']:>11.1f} {r['traced_bytes'] / 2**20:>11.1f} "
+            f"{r['peak_rss_kib'] / 1024:>13.1f} {r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
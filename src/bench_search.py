@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from htmlnode import markdown_to_html_node
+from search import SEARCH_DIR_NAME, SearchIndex, page_terms
+
+
+def make_vocabulary(size, rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+def make_page(i, vocabulary, weights, rng, words):
+    # word frequencies roughly follow Zipf's law, like real text
+    text = rng.choices(vocabulary, weights, k=words)
+    paragraphs = [" ".join(text[j:j + 60]) for j in range(0, words, 60)]
+    return f"# Page {i} {text[0]}\n\n" + "\n\n".join(f"Some **{p[:20]}** {p[20:]}" for p in paragraphs)
+
+
+def make_corpus(pages, words, vocabulary_size, seed=1):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    return [make_page(i, vocabulary, weights, rng, words) for i in range(pages)]
+
+
+def shard_sizes(public_dir):
+    terms_dir = os.path.join(public_dir, SEARCH_DIR_NAME, "terms")
+    return [entry.stat().st_size for entry in os.scandir(terms_dir)]
+
+
+def run(pages, words, vocabulary_size, changed_fraction, prefix_length):
+    corpus = make_corpus(pages, words, vocabulary_size)
+    results = {"pages": pages, "words_per_page": words, "vocabulary": vocabulary_size}
+
+    start = time.perf_counter()
+    extracted = []
+    for i, markdown in enumerate(corpus):
+        title = markdown.split("\n", 1)[0][2:]
+        extracted.append((f"page{i}/index.html", title, page_terms(markdown_to_html_node(markdown), title)))
+    results["parse_and_extract_s"] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        public = os.path.join(tmp, "docs")
+        state = os.path.join(tmp, "search.json")
+        index = SearchIndex(public, state, prefix_length=prefix_length)
+        start = time.perf_counter()
+        for rel_path, title, terms in extracted:
+            index.add(os.path.join(public, rel_path), title, terms)
+        written = index.save()
+        results["full_build_s"] = time.perf_counter() - start
+        results["shards"] = len(written)
+
+        sizes = shard_sizes(public)
+        results["shard_bytes_total"] = sum(sizes)
+        results["shard_bytes_median"] = statistics.median(sizes)
+        results["shard_bytes_max"] = max(sizes)
+        results["index_json_bytes"] = os.path.getsize(os.path.join(public, SEARCH_DIR_NAME, "index.json"))
+
+        # an incremental build: a few pages change, one is removed
+        rng = random.Random(2)
+        changed = rng.sample(extracted, max(1, int(pages * changed_fraction)))
+        start = time.perf_counter()
+        index = SearchIndex(public, state, prefix_length=prefix_length)
+        for rel_path, title, terms in changed:
+            terms = dict(terms)
+            terms[f"edit{rng.randint(0, 99)}"] = 1
+            index.add(os.path.join(public, rel_path), title, terms)
+        index.remove(os.path.join(public, extracted[-1][0]))
+        written = index.save()
+        results["incremental_s"] = time.perf_counter() - start
+        results["incremental_pages"] = len(changed) + 1
+        results["incremental_shards_rewritten"] = len(written)
+        shutil.rmtree(public)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index build time and shard sizes on a synthetic corpus.")
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--words", type=int, default=400, help="words per page")
+    parser.add_argument("--vocabulary", type=int, default=50000)
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of pages changed for the incremental run")
+    parser.add_argument("--prefix-length", type=int, default=2)
+    args = parser.parse_args()
+
+    r = run(args.pages, args.words, args.vocabulary, args.changed, args.prefix_length)
+    print(f"{r['pages']} pages x {r['words_per_page']} words, vocabulary {r['vocabulary']}")
+    print(f"   parse + extract terms   {r['parse_and_extract_s']:>8.2f} s")
+    print(f"   full index build        {r['full_build_s']:>8.2f} s  ({r['shards']} shards)")
+    print(
+        f"   incremental build       {r['incremental_s']:>8.2f} s  ({r['incremental_pages']} pages, "
+        f"{r['incremental_shards_rewritten']} shards rewritten)"
+    )
+    print(
+        f"   shard size              median {r['shard_bytes_median'] / 1024:.1f} KiB, "
+        f"max {r['shard_bytes_max'] / 1024:.1f} KiB, total {r['shard_bytes_total'] / 2**20:.1f} MiB"
+    )
+    print(f"   index.json              {r['index_json_bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
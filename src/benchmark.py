@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from blocktype import block_to_block_type
+from htmlnode import markdown_to_blocks, markdown_to_html_node, text_to_textnodes
+
+
+default_baseline_path = "./bench/baseline.json"
+default_threshold = 1.25
+
+
+def corpus_long_paragraphs(size):
+    sentence = "Plain words with **bold**, _italic_ and `code` spans in between. "
+    return "\n\n".join(f"# Title\n\n{sentence * 40}" if i == 0 else sentence * 40 for i in range(size))
+
+
+def corpus_links_and_images(size):
+    blocks = []
+    for i in range(size):
+        links = " ".join(f"[link {j}](/blog/{i}/{j}) and ![img {j}](/images/{j}.png)" for j in range(20))
+        blocks.append(f"See {links}.")
+    return "\n\n".join(blocks)
+
+
+def corpus_deep_lists(size):
+    blocks = []
+    for i in range(size):
+        blocks.append("\n".join(f"- item {j} of list {i} with a [link](/x/{j})" for j in range(50)))
+        blocks.append("\n".join(f"{j}. step {j} is _important_" for j in range(1, 51)))
+    return "\n\n".join(blocks)
+
+
+def corpus_big_code_blocks(size):
+    code = "\n".join(f"    line_{j} = compute(**kwargs)  # _not_ markdown" for j in range(200))
+    return "\n\n".join(f"Block {i}:\n\n```\n{code}\n```" for i in range(size))
+
+
+CORPORA = {
+    "long_paragraphs": corpus_long_paragraphs,
+    "links_and_images": corpus_links_and_images,
+    "deep_lists": corpus_deep_lists,
+    "big_code_blocks": corpus_big_code_blocks,
+}
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def bench_corpus(markdown, repeat):
+    blocks = markdown_to_blocks(markdown)
+    inline_texts = [" ".join(block.splitlines()) for block in blocks if not block.startswith("```")]
+    root = markdown_to_html_node(markdown)
+    return {
+        "markdown_to_blocks": best_of(lambda: markdown_to_blocks(markdown), repeat),
+        "block_to_block_type": best_of(lambda: [block_to_block_type(block) for block in blocks], repeat),
+        "text_to_textnodes": best_of(lambda: [text_to_textnodes(text) for text in inline_texts], repeat),
+        "markdown_to_html_node": best_of(lambda: markdown_to_html_node(markdown), repeat),
+        "to_html": best_of(root.to_html, repeat),
+    }
+
+
+def run(size, repeat, corpora=None):
+    results = {}
+    for name in corpora or CORPORA:
+        markdown = CORPORA[name](size)
+        results[name] = bench_corpus(markdown, repeat)
+        results[name]["bytes"] = len(markdown.encode())
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "size": size,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=default_threshold):
+    # returns (corpus, stage, baseline seconds, current seconds) for every slowdown past the threshold
+    regressions = []
+    for corpus, stages in current["results"].items():
+        for stage, seconds in stages.items():
+            if stage == "bytes":
+                continue
+            before = baseline.get("results", {}).get(corpus, {}).get(stage)
+            if before and seconds > before * threshold:
+                regressions.append((corpus, stage, before, seconds))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the markdown pipeline on generated corpora.")
+    parser.add_argument("--size", type=int, default=200, help="blocks per corpus")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA), help="only run these corpora")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=default_baseline_path)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=default_threshold, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    current = run(args.size, args.repeat, args.corpus)
+    for corpus, stages in current["results"].items():
+        print(f"{corpus} ({stages['bytes']} bytes)")
+        for stage, seconds in stages.items():
+            if stage != "bytes":
+                print(f"   {stage:<24} {seconds * 1000:>10.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("size") != current["size"]:
+        print(f"Baseline was recorded with --size {baseline.get('size')}, results are not comparable")
+        return
+    regressions = compare(current, baseline, args.threshold)
+    for corpus, stage, before, after in regressions:
+        print(f" ! {corpus}/{stage}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({after / before:.2f}x)")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -55,10 +55,78 @@ def block_to_block_type(block):
     return BlockType.PARAGRAPH
 
 
+def scan_blocks(markdown):
+    # Streams (block_type, lines) pairs from a document or any iterable of lines,
+    # classifying each block as its lines are read. Lines are stripped like
+    # markdown_to_blocks does, but a ``` fence runs to its closing ``` even across blank lines.
+    if isinstance(markdown, str):
+        markdown = markdown.splitlines()
 
+    block = []
+    fenced = False
+    all_quote = all_unordered = all_ordered = True
+    for line in markdown:
+        line = line.strip()
 
+        if fenced:
+            block.append(line)
+            if line == "```":
+                yield BlockType.CODE, block
+                block = []
+                fenced = False
+            continue
 
+        if not line:
+            if block:
+                yield _block_type_from_flags(block, all_quote, all_unordered, all_ordered), block
+                block = []
+            continue
 
-    
-    
-    
\ No newline at end of file
+        if not block:
+            if line == "```":
+                fenced = True
+                block.append(line)
+                continue
+            all_quote = all_unordered = all_ordered = True
+        block.append(line)
+        if all_quote and not line.startswith(">"):
+            all_quote = False
+        if all_unordered and not line.startswith("- "):
+            all_unordered = False
+        if all_ordered and not line.startswith(f"{len(block)}. "):
+            all_ordered = False
+
+    if fenced:
+        # an unclosed fence is not a code block; classify what it swallowed the old way
+        group = []
+        for line in block + [""]:
+            if line:
+                group.append(line)
+            elif group:
+                yield block_to_block_type("\n".join(group)), group
+                group = []
+    elif block:
+        yield _block_type_from_flags(block, all_quote, all_unordered, all_ordered), block
+
+
+def _block_type_from_flags(lines, all_quote, all_unordered, all_ordered):
+    # same precedence as block_to_block_type
+    if all_quote:
+        return BlockType.QUOTE
+    if len(lines) == 1 and is_heading(lines[0]):
+        return BlockType.HEADING
+    if all_unordered:
+        return BlockType.UNORDERED_LIST
+    if all_ordered:
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def is_heading(line):
+    count = 0
+    for char in line:
+        if char == "#":
+            count += 1
+        else:
+            break
+    return count > 0 and count < 7 and len(line) > count and line[count] == " " and line[count+1:].strip() != ""
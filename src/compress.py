@@ -0,0 +1,106 @@
+import gzip
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from copystatic import list_files
+from profiler import NULL_PROFILER
+
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".md", ".map", ".csv", ".ico",
+}
+# a .gz that saves less than this fraction of the original is not worth serving
+MIN_SAVING = 0.1
+
+
+class CompressResult:
+    def __init__(self):
+        self.compressed = []
+        self.skipped = []
+        self.incompressible = []
+        self.removed = []
+        # rel_path -> [size, mtime_ns, sha256, has .gz, level], for the next run
+        self.state = {}
+
+    def __repr__(self):
+        return (
+            f"CompressResult(compressed={len(self.compressed)}, skipped={len(self.skipped)}, "
+            f"incompressible={len(self.incompressible)}, removed={len(self.removed)})"
+        )
+
+
+def is_compressible(rel_path):
+    return not rel_path.endswith(".gz") and os.path.splitext(rel_path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def precompress(public_dir, previous=None, level=9, jobs=8, min_saving=MIN_SAVING, profiler=NULL_PROFILER):
+    # Writes a .gz next to every text output whose content changed since the run that
+    # produced `previous`; gzip releases the GIL, so a thread pool spreads it over cores.
+    previous = previous or {}
+    rel_paths = [rel_path for rel_path in list_files(public_dir) if is_compressible(rel_path)]
+
+    def compress(rel_path):
+        path = os.path.join(public_dir, rel_path)
+        return rel_path, compress_file(path, previous.get(rel_path), level, min_saving, profiler)
+
+    if jobs > 1 and len(rel_paths) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            outcomes = list(executor.map(compress, rel_paths))
+    else:
+        outcomes = [compress(rel_path) for rel_path in rel_paths]
+
+    result = CompressResult()
+    for rel_path, (outcome, state) in outcomes:
+        getattr(result, outcome).append(rel_path)
+        result.state[rel_path] = state
+
+    for rel_path in sorted(set(previous) - set(result.state)):
+        gz_path = os.path.join(public_dir, rel_path) + ".gz"
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        result.removed.append(rel_path)
+    return result
+
+
+def remove_compressed(public_dir, previous):
+    # for builds with precompression turned off: the .gz copies `previous` recorded, which
+    # would otherwise keep being served in place of the pages they were made from
+    removed = []
+    for rel_path, state in sorted(previous.items()):
+        gz_path = os.path.join(public_dir, rel_path) + ".gz"
+        if state[3] and os.path.exists(gz_path):
+            os.remove(gz_path)
+            removed.append(rel_path)
+    return removed
+
+
+def compress_file(path, previous, level=9, min_saving=MIN_SAVING, profiler=NULL_PROFILER):
+    # returns the outcome ("compressed", "skipped" or "incompressible") and the file's new state
+    gz_path = path + ".gz"
+    stat = os.stat(path)
+    # a previous run only counts if it used this level and its .gz (or lack of one) is still there
+    if previous is not None and (previous[3] != os.path.exists(gz_path) or previous[4] != level):
+        previous = None
+    if previous is not None and previous[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return "skipped", previous
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if previous is not None and previous[2] == digest:
+        # rewritten with the same content, e.g. a page rebuilt for an unrelated reason
+        return "skipped", [stat.st_size, stat.st_mtime_ns, digest, previous[3], level]
+
+    with profiler.phase("gzip", path) as phase:
+        # mtime=0 keeps the .gz byte-identical across builds of the same content
+        compressed = gzip.compress(data, level, mtime=0)
+        phase.add_bytes(len(data))
+    if len(compressed) > len(data) * (1 - min_saving):
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        return "incompressible", [stat.st_size, stat.st_mtime_ns, digest, False, level]
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.replace(tmp_path, gz_path)
+    return "compressed", [stat.st_size, stat.st_mtime_ns, digest, True, level]
@@ -1,16 +1,157 @@
+import json
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
+from manifest import hash_file
+from profiler import NULL_PROFILER
+from walk import walk_files
 
-def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
+def copy_files_recursive(source_dir_path, dest_dir_path, ignore=None):
+    os.makedirs(dest_dir_path, exist_ok=True)
+    for rel_path in list_files(source_dir_path, ignore):
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
         print(f" * {from_path} -> {dest_path}")
-        if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.copy(from_path, dest_path)
+
+
+# assets referenced from pages; anything else (robots.txt, favicon.ico, ...) keeps its name
+FINGERPRINT_EXTENSIONS = {
+    ".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".woff", ".woff2", ".ttf", ".otf",
+}
+
+
+class SyncResult:
+    def __init__(self):
+        # paths are relative to the public directory
+        self.copied = []
+        self.skipped = []
+        self.removed = []
+        # public path -> static path, for files synced under a fingerprinted name
+        self.renamed = {}
+        # static path -> [size, mtime_ns, public path], see fingerprint_files
+        self.fingerprints = {}
+
+    @property
+    def files(self):
+        return sorted(self.copied + self.skipped)
+
+    def __repr__(self):
+        return f"SyncResult(copied={len(self.copied)}, skipped={len(self.skipped)}, removed={len(self.removed)})"
+
+
+def sync_files(
+    source_dir_path, dest_dir_path, previous=(), use_hash=False, jobs=8, profiler=NULL_PROFILER, fingerprints=None,
+    ignore=None,
+):
+    # Copy only what changed since the last sync; `previous` lists the files that sync wrote.
+    # With `fingerprints` (the last sync's, or {}), assets are copied to content-hashed names.
+    # Files `ignore` excludes are left out, and removed if an earlier sync copied them.
+    result = SyncResult()
+    rel_paths = list_files(source_dir_path, ignore)
+    if fingerprints is not None:
+        result.fingerprints = fingerprint_files(source_dir_path, rel_paths, fingerprints)
+        result.renamed = {stamp[2]: rel_path for rel_path, stamp in result.fingerprints.items()}
+    to_copy = []
+    for rel_path in rel_paths:
+        dest_rel_path = result.fingerprints[rel_path][2] if rel_path in result.fingerprints else rel_path
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, dest_rel_path)
+        if is_unchanged(from_path, dest_path, use_hash):
+            result.skipped.append(dest_rel_path)
         else:
-            copy_files_recursive(from_path, dest_path)
+            to_copy.append(dest_rel_path)
+
+    def copy(dest_rel_path):
+        from_path = os.path.join(source_dir_path, result.renamed.get(dest_rel_path, dest_rel_path))
+        with profiler.phase("copy", from_path) as phase:
+            copy_file(from_path, os.path.join(dest_dir_path, dest_rel_path))
+            phase.add_bytes(os.path.getsize(from_path) if profiler is not NULL_PROFILER else 0)
+        return dest_rel_path
+
+    if jobs > 1 and len(to_copy) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            result.copied.extend(executor.map(copy, to_copy))
+    else:
+        result.copied.extend(copy(rel_path) for rel_path in to_copy)
+
+    current = set(result.copied) | set(result.skipped)
+    for rel_path in sorted(set(previous) - current):
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        result.removed.append(rel_path)
+    return result
+
+
+def copy_file(from_path, dest_path):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    # copyfile uses sendfile/fcopyfile where the platform has them
+    shutil.copyfile(from_path, dest_path)
+    # keeping the mtime is what lets the next sync skip the file
+    shutil.copystat(from_path, dest_path)
+
+
+def fingerprint_files(source_dir_path, rel_paths, previous=None):
+    # static path -> [size, mtime_ns, fingerprinted path]; files whose size and mtime match
+    # the previous run keep their name without being hashed again
+    previous = previous or {}
+    fingerprints = {}
+    for rel_path in rel_paths:
+        if os.path.splitext(rel_path)[1].lower() not in FINGERPRINT_EXTENSIONS:
+            continue
+        stat = os.stat(os.path.join(source_dir_path, rel_path))
+        stamp = previous.get(rel_path)
+        if stamp is None or stamp[:2] != [stat.st_size, stat.st_mtime_ns]:
+            digest = hash_file(os.path.join(source_dir_path, rel_path))
+            stamp = [stat.st_size, stat.st_mtime_ns, fingerprinted_name(rel_path, digest)]
+        fingerprints[rel_path] = stamp
+    return fingerprints
+
+
+def fingerprinted_name(rel_path, digest):
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:10]}{ext}"
+
+
+def asset_map(fingerprints):
+    # root-relative url -> fingerprinted url, as UrlRewriter and the asset manifest use it
+    return {
+        "/" + rel_path.replace(os.sep, "/"): "/" + stamp[2].replace(os.sep, "/")
+        for rel_path, stamp in sorted(fingerprints.items())
+    }
+
+
+def write_asset_manifest(path, mapping):
+    # the url -> fingerprinted url map for deploy tooling; removed when fingerprinting is off
+    if not mapping:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(mapping, f, indent=1, sort_keys=True)
+
+
+def list_files(dir_path, ignore=None):
+    return walk_files(dir_path, ignore)
+
+
+def is_unchanged(from_path, dest_path, use_hash=False):
+    try:
+        dest_stat = os.stat(dest_path)
+    except FileNotFoundError:
+        return False
+    from_stat = os.stat(from_path)
+    if from_stat.st_size != dest_stat.st_size:
+        return False
+    if from_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+        return True
+    if use_hash and hash_file(from_path) == hash_file(dest_path):
+        # same content under a new mtime, so just bring the mtime in line
+        shutil.copystat(from_path, dest_path)
+        return True
+    return False
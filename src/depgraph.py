@@ -0,0 +1,68 @@
+import os
+
+from urls import is_page_url, split_url
+
+
+def collect_asset_urls(node):
+    # root-relative urls a page pulls in: every <img src>, and <a href> to non-page files
+    urls = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children)
+        props = getattr(node, "props", None)
+        if not props:
+            continue
+        if node.tag == "img":
+            url = props.get("src")
+        elif node.tag == "a":
+            url = props.get("href")
+            if url and is_page_url(url):
+                continue
+        else:
+            continue
+        if url and url.startswith("/") and not url.startswith("//"):
+            urls.add(split_url(url)[0])
+    return sorted(urls)
+
+
+def page_dependencies(entry):
+    dependencies = [
+        ("source", entry["source"]),
+        ("template", entry.get("template")),
+        ("basepath", entry["basepath"]),
+    ]
+    dependencies.extend(("asset", url) for url in entry.get("assets", {}))
+    return dependencies
+
+
+class DependencyGraph:
+    # page outputs and what each one was built from, as recorded in the build manifest
+    def __init__(self, pages):
+        self.pages = pages
+        self.dependents = {}
+        for dest_path, entry in pages.items():
+            for dependency in page_dependencies(entry):
+                self.dependents.setdefault(dependency, set()).add(dest_path)
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        return cls(manifest.pages)
+
+    def dependencies(self, dest_path):
+        return page_dependencies(self.pages[str(dest_path)])
+
+    def invalidated_by(self, *changes):
+        # changes are (kind, key) pairs such as ("template", "./template.html") or ("asset", "/images/a.png")
+        outputs = set()
+        for kind, key in changes:
+            if kind == "source" or kind == "template":
+                key = os.path.normpath(key)
+                for (dep_kind, dep_key), dests in self.dependents.items():
+                    if dep_kind == kind and dep_key is not None and os.path.normpath(dep_key) == key:
+                        outputs |= dests
+            else:
+                outputs |= self.dependents.get((kind, key), set())
+        return sorted(outputs)
@@ -0,0 +1,291 @@
+import datetime
+import html
+import json
+import os
+import re
+
+from htmlnode import LeafNode, ParentNode
+from minify import MinifyStream
+from search import page_url
+from template import load_template
+from urls import as_url_rewriter
+
+
+METADATA_VERSION = 1
+BLOG_SECTION = "blog"
+FEED_NAME = "atom.xml"
+SITEMAP_NAME = "sitemap.xml"
+DEFAULT_PER_PAGE = 10
+FEED_ENTRIES = 20
+SUMMARY_LENGTH = 200
+# a date in a post's path ("blog/2024-05-01-tom/index.md") is its publication date
+DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def page_date(from_path):
+    # the date in the source path, else the source's modification time, as an Atom timestamp
+    match = DATE_RE.search(str(from_path))
+    if match:
+        try:
+            return datetime.date(*map(int, match.groups())).isoformat() + "T00:00:00Z"
+        except ValueError:
+            pass
+    mtime = datetime.datetime.fromtimestamp(os.path.getmtime(from_path), datetime.timezone.utc)
+    return mtime.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def node_text(node):
+    parts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(reversed(node.children))
+        elif node.tag != "img" and node.value:
+            parts.append(node.value)
+    return " ".join("".join(parts).split())
+
+
+def page_summary(node):
+    # The text of the first paragraph with words of its own, so a paragraph that is only
+    # a link ("< Back Home") or an image is passed over; None if there is none yet.
+    # `node` is a page's root div or, while a page streams, one of its blocks
+    blocks = node.children if getattr(node, "tag", None) == "div" else [node]
+    for block in blocks or ():
+        if getattr(block, "tag", None) != "p":
+            continue
+        if block.children is None or any(child.tag is None and child.value.strip() for child in block.children):
+            text = node_text(block)
+            if len(text) > SUMMARY_LENGTH:
+                text = text[:SUMMARY_LENGTH].rsplit(" ", 1)[0] + "…"
+            return text
+    return None
+
+
+class PageMetadata:
+    # Title, url, date and summary of every page, cached between builds in `path` so the
+    # blog index, feed and sitemap are made without reading any page but the ones built.
+    # Also remembers the aggregate files it wrote, to remove the ones no longer made.
+    def __init__(self, public_dir, path):
+        self.public_dir = public_dir
+        self.path = path
+        self.pages = {}
+        self.outputs = []
+        self.dirty = False
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") == METADATA_VERSION:
+            self.pages = data["pages"]
+            self.outputs = data["outputs"]
+
+    def rel_path(self, dest_path):
+        return os.path.relpath(dest_path, self.public_dir)
+
+    def __contains__(self, dest_path):
+        return self.rel_path(dest_path) in self.pages
+
+    def update(self, dest_path, from_path, meta):
+        # `meta` is the title and summary from the page's build record
+        rel_path = self.rel_path(dest_path)
+        self.pages[rel_path] = dict(meta, url=page_url(rel_path), date=page_date(from_path))
+        self.dirty = True
+
+    def remove(self, dest_path):
+        if self.pages.pop(self.rel_path(dest_path), None) is not None:
+            self.dirty = True
+
+    def posts(self, section=BLOG_SECTION):
+        # the section's pages, newest first
+        prefix = section + "/"
+        posts = [meta for meta in self.pages.values() if meta["url"].startswith(prefix) and meta["url"] != prefix]
+        posts.sort(key=lambda meta: meta["url"])
+        posts.sort(key=lambda meta: meta["date"], reverse=True)
+        return posts
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"version": METADATA_VERSION, "pages": self.pages, "outputs": self.outputs},
+                f, sort_keys=True, ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+class AggregateResult:
+    def __init__(self):
+        # paths are relative to the public directory
+        self.written = []
+        self.unchanged = []
+        self.removed = []
+        # aggregates not written because a content page has the same output path
+        self.conflicts = []
+
+    def __repr__(self):
+        return (
+            f"AggregateResult(written={len(self.written)}, unchanged={len(self.unchanged)}, "
+            f"removed={len(self.removed)}, conflicts={len(self.conflicts)})"
+        )
+
+
+def listing_path(section, number):
+    # page 1 is the section's index, later pages go under section/page/N/
+    if number == 1:
+        return f"{section}/index.html"
+    return f"{section}/page/{number}/index.html"
+
+
+def listing_node(section, title, posts, number, count):
+    children = [LeafNode("h1", html.escape(title))]
+    for meta in posts:
+        day = meta["date"][:10]
+        post = [
+            ParentNode("h2", [LeafNode("a", html.escape(meta["title"]), {"href": "/" + meta["url"]})]),
+            ParentNode("p", [LeafNode("time", day, {"datetime": meta["date"]})]),
+        ]
+        if meta["summary"]:
+            post.append(LeafNode("p", html.escape(meta["summary"])))
+        children.append(ParentNode("section", post))
+    links = []
+    if number > 1:
+        links.append(LeafNode("a", "&larr; Newer", {"href": "/" + page_url(listing_path(section, number - 1))}))
+    if number < count:
+        links.append(LeafNode("a", "Older &rarr;", {"href": "/" + page_url(listing_path(section, number + 1))}))
+    links.append(LeafNode("a", "Atom feed", {"href": f"/{section}/{FEED_NAME}"}))
+    children.append(ParentNode("nav", links))
+    return ParentNode("div", children)
+
+
+def render_listing(template, title, node, minify):
+    parts = []
+    stream = MinifyStream(parts) if minify else parts
+    template.render_to(stream, {"Title": title, "Content": node})
+    if minify:
+        stream.close()
+    return "".join(parts)
+
+
+def atom_feed(section, title, posts, prefix):
+    feed_url = f"{prefix}{section}/{FEED_NAME}"
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{html.escape(title)}</title>",
+        f'<link href="{html.escape(feed_url)}" rel="self"/>',
+        f'<link href="{html.escape(prefix + section)}/"/>',
+        f"<id>{html.escape(feed_url)}</id>",
+        f"<updated>{posts[0]['date'] if posts else '1970-01-01T00:00:00Z'}</updated>",
+    ]
+    for meta in posts[:FEED_ENTRIES]:
+        url = html.escape(prefix + meta["url"])
+        lines += [
+            "<entry>",
+            f"<title>{html.escape(meta['title'])}</title>",
+            f'<link href="{url}"/>',
+            f"<id>{url}</id>",
+            f"<updated>{meta['date']}</updated>",
+        ]
+        if meta["summary"]:
+            lines.append(f"<summary>{html.escape(meta['summary'])}</summary>")
+        lines.append("</entry>")
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def sitemap(entries, prefix):
+    # entries are (url, date) pairs
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for url, date in sorted(entries):
+        lines.append(f"<url><loc>{html.escape(prefix + url)}</loc><lastmod>{date[:10]}</lastmod></url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def write_aggregates(
+    metadata, template_path, urls, per_page=DEFAULT_PER_PAGE, minify=False, section=BLOG_SECTION, title="Blog",
+):
+    # Writes the section's paginated index, its Atom feed and the site's sitemap.xml from
+    # `metadata` alone. Files whose content is unchanged are left untouched, so their
+    # mtimes (and any .gz copies) stay put; aggregates made last time but not now are removed.
+    urls = as_url_rewriter(urls)
+    template = load_template(template_path, urls)
+    posts = metadata.posts(section)
+    pages = [posts[i:i + per_page] for i in range(0, len(posts), per_page)] or [[]]
+    outputs = {}
+    for number, chunk in enumerate(pages, 1):
+        page_title = title if number == 1 else f"{title} - page {number} of {len(pages)}"
+        node = listing_node(section, page_title, chunk, number, len(pages))
+        outputs[listing_path(section, number)] = (render_listing(template, page_title, node, minify), chunk)
+    outputs[f"{section}/{FEED_NAME}"] = (atom_feed(section, title, posts, urls.prefix), None)
+
+    entries = [(meta["url"], meta["date"]) for meta in metadata.pages.values()]
+    for rel_path, (_, chunk) in outputs.items():
+        if chunk is not None and rel_path not in metadata.pages:
+            entries.append((page_url(rel_path), chunk[0]["date"] if chunk else "1970-01-01"))
+    outputs[SITEMAP_NAME] = (sitemap(entries, urls.prefix), None)
+
+    result = AggregateResult()
+    for rel_path, (text, _) in outputs.items():
+        if rel_path in metadata.pages:
+            result.conflicts.append(rel_path)
+            continue
+        if write_if_changed(os.path.join(metadata.public_dir, rel_path), text):
+            result.written.append(rel_path)
+        else:
+            result.unchanged.append(rel_path)
+    made = result.written + result.unchanged
+    result.removed = remove_outputs(metadata.public_dir, [rel_path for rel_path in metadata.outputs if rel_path not in made])
+    if sorted(made) != metadata.outputs:
+        metadata.outputs = sorted(made)
+        metadata.dirty = True
+    return result
+
+
+def write_if_changed(path, text):
+    try:
+        with open(path, "r") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return True
+
+
+def remove_outputs(public_dir, rel_paths):
+    removed = []
+    for rel_path in rel_paths:
+        path = os.path.join(public_dir, rel_path)
+        if os.path.exists(path):
+            os.remove(path)
+            removed.append(rel_path)
+        if os.path.exists(path + ".gz"):
+            os.remove(path + ".gz")
+        # blog/page/3/ goes with its index.html
+        dir_path = os.path.dirname(path)
+        while os.path.normpath(dir_path) != os.path.normpath(public_dir):
+            try:
+                os.rmdir(dir_path)
+            except OSError:
+                break
+            dir_path = os.path.dirname(dir_path)
+    return removed
+
+
+def remove_aggregates(public_dir, path):
+    # for builds with the aggregates turned off; returns what was removed
+    if not os.path.exists(path):
+        return []
+    metadata = PageMetadata(public_dir, path)
+    removed = remove_outputs(public_dir, metadata.outputs)
+    os.remove(path)
+    return removed
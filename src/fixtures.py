@@ -0,0 +1,28 @@
+import os
+import tempfile
+
+
+class FileTreeMixin:
+    # a temporary directory for each test, with helpers to fill it in and read it back
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, path, text, newline=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", newline=newline) as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def read_tree(self, root):
+        # rel_path -> bytes for every file under root
+        files = {}
+        for dir_path, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dir_path, filename)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root)] = f.read()
+        return files
@@ -1,45 +1,373 @@
+import collections
+import contextlib
+import itertools
 import os
-from htmlnode import markdown_to_html_node
+from concurrent.futures import ProcessPoolExecutor
+from depgraph import collect_asset_urls
+from blocktype import scan_blocks
+from feeds import page_summary
+from htmlnode import block_lines_to_html_node, markdown_to_html_node
+from imagesize import add_image_sizes
+from minify import MinifyStream
+from profiler import NULL_PROFILER, Profiler, TimedStream
+from search import merge_terms, page_terms
+from template import load_template
+from walk import walk_files
 
 from pathlib import Path
 
 
+# pages submitted to each worker process ahead of the one being collected
+IN_FLIGHT_PER_WORKER = 4
+
+# A page to build, as handed to a worker process. `entry` is its manifest entry and
+# `profile` whether the worker should time itself; the rest are generate_page's arguments.
+PageJob = collections.namedtuple(
+    "PageJob",
+    "from_path template_path dest_path basepath entry profile cache minify images stream_over search",
+)
+# a page whose source was already read, for render_page in a worker process
+RenderJob = collections.namedtuple(
+    "RenderJob", "markdown_content template_path basepath page profile cache minify images search",
+)
+
+
+class PageBuildError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(f"{len(failures)} page(s) failed: " + ", ".join(path for path, _ in failures))
+
+
+def collect_pages(dir_path_content, dest_dir_path, ignore=None):
+    # (source, output) pairs for every page, in path order
+    return [
+        (os.path.join(dir_path_content, rel_path), Path(dest_dir_path, rel_path).with_suffix(".html"))
+        for rel_path in walk_files(dir_path_content, ignore)
+    ]
+
+
+def generate_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, basepath, manifest=None, jobs=1, profiler=NULL_PROFILER,
+    explain=False, pipeline=None, cache=None, minify=False, images=None, stream_over=None, shard=None, ignore=None,
+    search=None, metadata=None,
+):
+    # Jobs are made as the build reaches them and each page's outcome is recorded as soon as
+    # it is done, so memory does not grow with the number of pages beyond the page list and
+    # the manifest: sources, node trees and html are released page by page.
+    pages = collect_pages(dir_path_content, dest_dir_path, ignore)
+    if shard is not None:
+        # only this machine's share of the site, see shard.py
+        from shard import select_shard
+        pages = select_shard(pages, shard, dir_path_content)
+    work = _page_jobs(
+        pages, template_path, basepath, manifest, profiler is not NULL_PROFILER, explain, cache, minify, images,
+        stream_over, search.token if search is not None else None, metadata,
+    )
+    failures = []
+    count = 0
+
+    def record(job, outcome):
+        nonlocal count
+        from_path, dest_path = job.from_path, job.dest_path
+        error, events, result = outcome
+        count += 1
+        profiler.extend(events)
+        if error is not None:
+            print(f" ! {from_path}: {error}")
+            failures.append((from_path, error))
+            return
+        if "minified" in result:
+            print_minified(dest_path, *result["minified"])
+        if images is not None and "images" in result:
+            images.update(result["images"])
+        if search is not None and "search" in result:
+            search.add(dest_path, *result["search"])
+        if metadata is not None:
+            metadata.update(dest_path, from_path, result["meta"])
+        if manifest is not None:
+            manifest.record(dest_path, job.entry, result["assets"])
+
+    if pipeline is not None:
+        # asyncio pipeline overlapping reads, rendering and writes
+        from pipeline import run_pipeline
+        run_pipeline(work, pipeline, jobs, profiler, record)
+    else:
+        for job, outcome in _run_jobs(work, jobs):
+            record(job, outcome)
+    if failures:
+        raise PageBuildError(sorted(failures, key=lambda failure: str(failure[0])))
+    return count
+
+
+def _page_jobs(
+    pages, template_path, basepath, manifest, profile, explain, cache, minify, images, stream_over, search, metadata,
+):
+    # the PageJob for each page that needs building, made only when the build asks for it
+    for from_path, dest_path in pages:
+        entry = None
+        if manifest is not None:
+            entry = manifest.page_entry(from_path, template_path, basepath, minify, images is not None, search)
+            reasons = manifest.stale_reasons(dest_path, entry)
+            if not reasons and metadata is not None and dest_path not in metadata:
+                reasons = ["page metadata not cached"]
+            if not reasons:
+                continue
+            if explain:
+                print(f" ? {dest_path}: {', '.join(reasons)}")
+        yield PageJob(
+            from_path, template_path, dest_path, basepath, entry, profile, cache, minify, images, stream_over, search,
+        )
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
-        else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
 
+def _run_jobs(work, jobs):
+    # (job, outcome) pairs in work order. With several processes only IN_FLIGHT_PER_WORKER
+    # pages per worker are submitted ahead, so queued jobs and finished results stay bounded
+    # however big the site is; a single page is built in this process without a pool.
+    work = iter(work)
+    head = list(itertools.islice(work, 2))
+    if jobs <= 1 or len(head) < 2:
+        for job in itertools.chain(head, work):
+            yield job, _generate_page_job(job)
+        return
+    in_flight = collections.deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for job in itertools.chain(head, work):
+            if len(in_flight) >= jobs * IN_FLIGHT_PER_WORKER:
+                done, future = in_flight.popleft()
+                yield done, future.result()
+            in_flight.append((job, executor.submit(_generate_page_job, job)))
+        while in_flight:
+            done, future = in_flight.popleft()
+            yield done, future.result()
+
+
+def _generate_page_job(job):
+    # runs in a worker process, so errors and profile events come back as plain data
+    profiler = Profiler() if job.profile else NULL_PROFILER
+    try:
+        result = generate_page(
+            job.from_path, job.template_path, job.dest_path, job.basepath, profiler=profiler, cache=job.cache,
+            minify=job.minify, images=job.images, stream_over=job.stream_over, search=job.search,
+        )
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", profiler.events, None
+    return None, profiler.events, result
+
+
+def _render_page_job(job):
+    profiler = Profiler() if job.profile else NULL_PROFILER
+    try:
+        html, result = render_page(
+            job.markdown_content, job.template_path, job.basepath, job.page, profiler, job.cache, job.minify,
+            job.images, job.search,
+        )
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", profiler.events, None, None
+    return None, profiler.events, html, result
+
+
+def generate_page(
+    from_path, template_path, dest_path, basepath, manifest=None, profiler=NULL_PROFILER, cache=None, minify=False,
+    images=None, stream_over=None, search=None,
+):
+    # With a manifest, pages whose inputs are unchanged since the last build are skipped
+    # and None is returned. Otherwise returns what the build records about the page.
+    # Sources bigger than stream_over bytes are converted block by block, never held whole.
+    entry = None
+    if manifest is not None:
+        entry = manifest.page_entry(from_path, template_path, basepath, minify, images is not None, search)
+        if manifest.is_fresh(dest_path, entry):
+            return None
 
-def generate_page(from_path, template_path, dest_path, basepath):
     print(f" * {from_path} {template_path} -> {dest_path}")
-    from_file = open(from_path, "r")
-    markdown_content = from_file.read()
-    from_file.close()
+    page = str(from_path)
+    if is_streamed(from_path, stream_over):
+        template, values, result = stream_source(from_path, template_path, basepath, page, profiler, images, search)
+    else:
+        markdown_content = read_source(from_path, profiler)
+        template, values, result = parse_page(
+            markdown_content, template_path, basepath, page, profiler, cache, images, search
+        )
+
+    dest_dir_path = os.path.dirname(dest_path)
+    if dest_dir_path != "":
+        os.makedirs(dest_dir_path, exist_ok=True)
+    # "render" covers to_html and template substitution and includes the "write" time
+    with profiler.phase("render", page) as phase:
+        with open_output(dest_path) as to_file:
+            stream = to_file if profiler is NULL_PROFILER else TimedStream(to_file, profiler, "write", page)
+            # the page is streamed into the file rather than assembled as one string
+            render_to(template, stream, values, result, minify)
+        if stream is not to_file:
+            stream.finish()
+            phase.add_bytes(stream.bytes)
+
+    if manifest is not None:
+        manifest.record(dest_path, entry, result["assets"])
+    return result
+
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
+def is_streamed(from_path, stream_over):
+    return stream_over is not None and os.path.getsize(from_path) > stream_over
 
-    node = markdown_to_html_node(markdown_content)
-    html = node.to_html()
 
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', 'href="' + basepath)
-    template = template.replace('src="/', 'src="' + basepath)
+def read_source(from_path, profiler=NULL_PROFILER):
+    with profiler.phase("read", str(from_path)) as phase:
+        with open(from_path, "r") as from_file:
+            markdown_content = from_file.read()
+        phase.add_bytes(len(markdown_content))
+    return markdown_content
 
+
+def parse_page(
+    markdown_content, template_path, basepath, page=None, profiler=NULL_PROFILER, cache=None, images=None, search=None
+):
+    # Returns the compiled template, the values to fill it with and the page's build record.
+    # basepath may also be a UrlRewriter; either way the template rewrites urls as it renders.
+    # With `search` (the index token) the record carries the page's title and terms.
+    with profiler.phase("template", page):
+        template = load_template(template_path, basepath)
+
+    with profiler.phase("parse", page):
+        cached = cache.get(markdown_content) if cache is not None else None
+        if cached is not None:
+            node, title, assets = cached
+        else:
+            node = markdown_to_html_node(markdown_content)
+            title = extract_title(markdown_content)
+            assets = collect_asset_urls(node)
+            if cache is not None:
+                cache.put(markdown_content, node, title, assets)
+        if template.urls is not None and template.urls.fingerprints:
+            # the template's own asset urls change with their content too
+            assets = sorted(set(assets).union(template.asset_urls))
+        result = {"assets": assets, "meta": {"title": title, "summary": page_summary(node)}}
+
+    if images is not None:
+        with profiler.phase("image sizes", page):
+            # after the parse cache, whose entries stay independent of the image files
+            probed = add_image_sizes(node, images, template.urls)
+        if probed:
+            result["images"] = probed
+
+    if search:
+        with profiler.phase("index", page):
+            result["search"] = [title, page_terms(node, title)]
+
+    return template, {"Title": title, "Content": node}, result
+
+
+def stream_source(from_path, template_path, basepath, page=None, profiler=NULL_PROFILER, images=None, search=None):
+    # parse_page for sources too big to read at once: the content is parsed while it renders,
+    # and the page record is filled in as it goes
+    with profiler.phase("template", page):
+        template = load_template(template_path, basepath)
+    with profiler.phase("parse", page):
+        title = scan_title(from_path)
+    # the summary is filled in when the first paragraph streams by
+    result = {"assets": [], "meta": {"title": title, "summary": None}}
+    if search:
+        # block terms are added as the content streams
+        result["search"] = [title, page_terms(None, title)]
+    return template, {"Title": title, "Content": StreamedContent(from_path, result, images)}, result
+
+
+class StreamedContent:
+    # Renders a markdown file like markdown_to_html_node(...).write_html, reading it line by
+    # line and holding one block at a time; peak memory follows the largest block.
+    def __init__(self, path, result, images=None):
+        self.path = path
+        self.result = result
+        self.images = images
+
+    def write_html(self, stream, urls=None):
+        write = stream.append if isinstance(stream, list) else stream.write
+        assets = set(self.result["assets"])
+        empty = True
+        with open(self.path, "r") as f:
+            for block_type, lines in scan_blocks(f):
+                node = block_lines_to_html_node(lines, block_type)
+                assets.update(collect_asset_urls(node))
+                if self.images is not None:
+                    probed = add_image_sizes(node, self.images, urls)
+                    if probed:
+                        self.result.setdefault("images", {}).update(probed)
+                if self.result["meta"]["summary"] is None:
+                    self.result["meta"]["summary"] = page_summary(node)
+                if "search" in self.result:
+                    merge_terms(self.result["search"][1], page_terms(node))
+                if empty:
+                    write("<div>")
+                    empty = False
+                node.write_html(stream, urls)
+        write("<div></div>" if empty else "</div>")
+        self.result["assets"] = sorted(assets)
+
+
+def render_page(
+    markdown_content, template_path, basepath, page=None, profiler=NULL_PROFILER, cache=None, minify=False, images=None,
+    search=None,
+):
+    # the in-memory counterpart of generate_page, for pipelines that write elsewhere
+    template, values, result = parse_page(
+        markdown_content, template_path, basepath, page, profiler, cache, images, search
+    )
+    with profiler.phase("render", page) as phase:
+        parts = []
+        render_to(template, parts, values, result, minify)
+        html = "".join(parts)
+        phase.add_bytes(len(html))
+    return html, result
+
+
+def render_to(template, stream, values, result, minify=False):
+    if not minify:
+        template.render_to(stream, values)
+        return
+    # minified on the way through, so the page is never held unminified
+    stream = MinifyStream(stream)
+    template.render_to(stream, values)
+    stream.close()
+    result["minified"] = [stream.bytes_in, stream.bytes_out]
+
+
+def print_minified(dest_path, size, minified_size):
+    saved = size - minified_size
+    print(f"   {dest_path}: minified {size} -> {minified_size} bytes, saved {saved} ({saved / max(size, 1):.1%})")
+
+
+def write_output(dest_path, html, page=None, profiler=NULL_PROFILER):
     dest_dir_path = os.path.dirname(dest_path)
     if dest_dir_path != "":
         os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+    with profiler.phase("write", page) as phase:
+        with open_output(dest_path) as to_file:
+            to_file.write(html)
+        phase.add_bytes(len(html))
+
+
+@contextlib.contextmanager
+def open_output(dest_path):
+    # Pages are written to a temporary file that replaces dest_path only once complete, so
+    # a render that fails partway leaves the last good output rather than half a page.
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, "w") as to_file:
+            yield to_file
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def scan_title(path):
+    # extract_title without reading the whole file
+    with open(path, "r") as f:
+        for line in f:
+            if line.startswith("# "):
+                return line[2:].rstrip("\n")
+    raise ValueError("no title found")
 
 
 def extract_title(md):
@@ -1,99 +1,73 @@
+import re
+
 from textnode import TextNode, TextType
-from blocktype import BlockType, block_to_block_type
+from blocktype import BlockType, scan_blocks
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
     html_node_child = []
     
-    for block in blocks:
-        if block.strip():  # Only process non-empty blocks
-            block_type = block_to_block_type(block)
-            html_node_child.append(block_with_type_to_html_node(block, block_type))
+    for block_type, lines in scan_blocks(markdown):
+        html_node_child.append(block_lines_to_html_node(lines, block_type))
     
     # Special case for completely empty markdown
     if not html_node_child:
         # We need to create a special case for the empty div
         # Return a custom object that renders to "<div></div>"
         class EmptyDiv:
-            def to_html(self):
+            def to_html(self, urls=None):
                 return "<div></div>"
+            def write_html(self, stream, urls=None):
+                (stream.append if isinstance(stream, list) else stream.write)(self.to_html())
         return EmptyDiv()
     
     html_node = ParentNode("div", children=html_node_child)
     return html_node
 
 def block_with_type_to_html_node(block, block_type):
+    lines = block.splitlines()
+    if block_type == BlockType.CODE and not (lines[0] == "```" and lines[-1] == "```"):
+        # return as formatted if not triple backtick
+        return ParentNode("pre", [ParentNode("code", [LeafNode(None, block)])])
+    return block_lines_to_html_node(lines, block_type)
+
+def block_lines_to_html_node(lines, block_type):
     #Based on the type of block, create a new HTMLNode with the proper data including block data
     if block_type==BlockType.CODE:
-        # Resolve the entire block and create the appropriate HTMLNode
-        lines = block.splitlines()
-        if lines[0] == "```" and lines[-1] == "```":
-            code_lines = lines[1:-1]  #takes all lines except first and last line
-            code_content = "\n".join(code_lines)+"\n" #allows a full line before and after the code block
-            html_node = ParentNode("pre", [ParentNode("code", [LeafNode(None, code_content)])])        
-            return html_node
-        else:
-            # return as formatted if not triple backtick
-            return ParentNode("pre", [ParentNode("code", [LeafNode(None, block)])])
+        code_lines = lines[1:-1]  #takes all lines except the opening and closing fence
+        code_content = "\n".join(code_lines)+"\n" #allows a full line before and after the code block
+        return ParentNode("pre", [ParentNode("code", [LeafNode(None, code_content)])])
          
     elif block_type == BlockType.PARAGRAPH:
-        normalized_block = " ".join(block.splitlines())
-        children = text_to_children(normalized_block)
-        node = ParentNode("p", children=children)
-        return node 
+        children = text_to_children(" ".join(lines))
+        return ParentNode("p", children=children)
     
     elif block_type == BlockType.QUOTE:
-        # Remove '>' characters and process the content
-        lines = block.strip().split("\n")
-        quote_content = []
-        for line in lines:
-            # Remove the '>' and any leading space
-            if line.startswith(">"):
-                line = line[1:].lstrip()
-            quote_content.append(line)
-        
-        quote_text = " ".join(quote_content)
-        children = text_to_children(quote_text)
-        node = ParentNode("blockquote", children=children)
-        return node
+        # Remove '>' characters and any leading space
+        quote_content = [line[1:].lstrip() if line.startswith(">") else line for line in lines]
+        children = text_to_children(" ".join(quote_content))
+        return ParentNode("blockquote", children=children)
        
     elif block_type == BlockType.HEADING:
-        level = get_heading_level(block)
-        heading_text = block[level+1:].strip()  # skips '#' chars and space
-        children = text_to_children(heading_text)
-        node = ParentNode(f"h{level}", children=children)        
-        return node
+        line = lines[0]
+        level = get_heading_level(line)
+        children = text_to_children(line[level+1:].strip())  # skips '#' chars and space
+        return ParentNode(f"h{level}", children=children)
     
     elif block_type == BlockType.ORDERED_LIST:
-        # Split by newlines to get individual items
-        items = block.strip().split("\n")
         list_items = []
-        
-        for item in items:
-            # Remove the number and period, and any leading whitespace
+        for item in lines:
             # Find the first period and take everything after it
             content = item[item.find(".")+1:].strip()
-            # Create li node with properly processed content
-            li_children = text_to_children(content)
-            list_items.append(ParentNode("li", children=li_children))
-        
-        node = ParentNode("ol", children=list_items)
-        return node   
+            list_items.append(ParentNode("li", children=text_to_children(content)))
+        return ParentNode("ol", children=list_items)
     
     elif block_type == BlockType.UNORDERED_LIST:
-        # Split by newlines to get individual items
-        items = block.strip().split("\n")
         list_items = []
-        
-        for item in items:
+        for item in lines:
             # Remove the dash and any leading whitespace
             content = item[item.find("-")+1:].strip()
-            # Create li node with properly processed content
-            li_children = text_to_children(content)
-            list_items.append(ParentNode("li", children=li_children))
-        
-        node = ParentNode("ul", children=list_items)
-        return node 
+            list_items.append(ParentNode("li", children=text_to_children(content)))
+        return ParentNode("ul", children=list_items)
 
 def text_to_children(text):
     textnodes = text_to_textnodes(text)
@@ -252,6 +226,10 @@ def split_nodes_image(old_nodes):
 def split_nodes_link(old_nodes):
     new_nodes = []
     for node in old_nodes:
+        # images (and anything else already split out) pass through untouched
+        if node.text_type != TextType.NORMAL_TEXT:
+            new_nodes.append(node)
+            continue
         text=node.text
         link = extract_markdown_links(text)
         while link:
@@ -270,6 +248,10 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 def text_to_textnodes(text):
+    return scan_inline(text)
+
+def text_to_textnodes_multipass(text):
+    # the original split chain, kept as the reference for scan_inline
     nodes = [TextNode(text, TextType.NORMAL_TEXT)]
     
     # First handle image and link markdown (more complex patterns)
@@ -283,6 +265,65 @@ def text_to_textnodes(text):
     
     return nodes
 
+INLINE_TOKEN_RE = re.compile(r"!\[|\[|\*\*|_|`")
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+DELIMITER_TYPES = {"**": TextType.BOLD_TEXT, "_": TextType.ITALIC_TEXT, "`": TextType.CODE_TEXT}
+
+def scan_inline(text):
+    # One left-to-right walk that produces the same nodes as text_to_textnodes_multipass.
+    # Images and links split the text into segments first, then inside a segment
+    # ** outranks _ which outranks `, exactly like the order of the old split passes.
+    nodes = []
+    open_type = None  # type of the delimited span we are inside, if any
+    segment_start = 0
+    run_start = 0
+    pos = 0
+
+    def close_segment(end):
+        if open_type is not None:
+            raise ValueError(f"Unmatched markdown delimiter in text node: {text[segment_start:end]}")
+        if end > segment_start:
+            nodes.append(TextNode(text[run_start:end], TextType.NORMAL_TEXT))
+
+    while True:
+        match = INLINE_TOKEN_RE.search(text, pos)
+        if match is None:
+            break
+        start = match.start()
+        token = match.group()
+
+        if token == "![" or token == "[":
+            span = (IMAGE_RE if token == "![" else LINK_RE).match(text, start)
+            if span is None:
+                pos = match.end()
+                continue
+            close_segment(start)
+            node_type = TextType.IMAGES if token == "![" else TextType.LINKS
+            nodes.append(TextNode(span.group(1), node_type, span.group(2)))
+            segment_start = run_start = pos = span.end()
+            continue
+
+        token_type = DELIMITER_TYPES[token]
+        pos = match.end()
+        if open_type is None:
+            nodes.append(TextNode(text[run_start:start], TextType.NORMAL_TEXT))
+            open_type = token_type
+            run_start = pos
+        elif open_type == token_type:
+            nodes.append(TextNode(text[run_start:start], open_type))
+            open_type = None
+            run_start = pos
+        elif open_type == TextType.BOLD_TEXT or token_type == TextType.CODE_TEXT:
+            # a weaker delimiter inside a stronger span is just text
+            continue
+        else:
+            # a stronger delimiter ends the piece while a weaker span is still open
+            raise ValueError(f"Unmatched markdown delimiter in text node: {text[segment_start:start]}")
+
+    close_segment(len(text))
+    return nodes
+
 def markdown_to_blocks(markdown):
     # First strip the entire markdown string
     markdown = markdown.strip()
@@ -306,20 +347,43 @@ def markdown_to_blocks(markdown):
     return blocks            
 
 class HTMLNode:
+    # pages build tens of thousands of nodes, so skip the per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, urls=None):
         raise NotImplementedError
+
+    def write_html(self, stream, urls=None):
+        # Renders into a file-like object or a list buffer without building
+        # nested strings; an explicit stack keeps deep trees off the recursion limit.
+        # With a UrlRewriter, href/src values are rewritten as they are written.
+        write = stream.append if isinstance(stream, list) else stream.write
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                write(node)
+            elif isinstance(node, ParentNode):
+                node.validate()
+                write(f"<{node.tag}{node.props_to_html(urls)}>")
+                stack.append(f"</{node.tag}>")
+                stack.extend(reversed(node.children))
+            else:
+                write(node.to_html(urls))
     
-    def props_to_html(self):
+    def props_to_html(self, urls=None):
         if not self.props:
             return ""
         props_str = ""
         for key, value in self.props.items():
+            if urls is not None and (key == "href" or key == "src"):
+                value = urls.rewrite(key, value)
             props_str += f' {key}="{value}"'
         return props_str
 
@@ -332,13 +396,15 @@ class HTMLNode:
         )
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         if value is None:
             raise ValueError("LeafNode must have a value")
         # Call the parent's __init__, with empty children list
         super().__init__(tag=tag, value=value, children=None, props=props)
     
-    def to_html(self):
+    def to_html(self, urls=None):
         if self.value is None:
             raise ValueError("LeafNode must have a value")
         
@@ -347,7 +413,7 @@ class LeafNode(HTMLNode):
             return self.value
         
         # Handle self-closing tags like <img>
-        props_html = self.props_to_html()
+        props_html = self.props_to_html(urls)
         if self.tag == "img":
             return f"<{self.tag}{props_html}>"
         
@@ -355,13 +421,12 @@ class LeafNode(HTMLNode):
         return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        self.tag = tag
-        self.children = children
-        self.props = props
+        super().__init__(tag=tag, value=None, children=children, props=props)
 
-    def to_html(self):
-        # Render the parent node as an HTML element with properties and children
+    def validate(self):
         if self.children is None or not isinstance(self.children, list):
             raise ValueError("ParentNode must have children")
         if len(self.children) == 0:
@@ -371,5 +436,8 @@ class ParentNode(HTMLNode):
         if any(not isinstance(child, HTMLNode) for child in self.children):
             raise ValueError("All children must be HTMLNode instances")
 
-        props_html = self.props_to_html()
-        return f"<{self.tag}{props_html}>{''.join(child.to_html() for child in self.children)}</{self.tag}>"
\ No newline at end of file
+    def to_html(self, urls=None):
+        # Render the parent node as an HTML element with properties and children
+        buffer = []
+        self.write_html(buffer, urls)
+        return "".join(buffer)
@@ -0,0 +1,171 @@
+import json
+import os
+import struct
+
+from urls import split_url
+
+
+def probe_image(path):
+    # (width, height) from the file header alone, or None for formats we don't know
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return _webp_size(head)
+        if head[:2] == b"\xff\xd8":
+            f.seek(2)
+            return _jpeg_size(f)
+    return None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        b0, b1, b2, b3 = head[21:25]
+        return 1 + (b0 | (b1 & 0x3F) << 8), 1 + (b1 >> 6 | b2 << 2 | (b3 & 0x0F) << 10)
+    if chunk == b"VP8X" and len(head) >= 30:
+        return 1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little")
+    return None
+
+
+def _jpeg_size(f):
+    # walk the marker segments up to the first start-of-frame
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD9:
+            continue
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        (length,) = struct.unpack(">H", length)
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+# the sizes file as read once per process, shared by every ImageSizes unpickled there
+_loaded = {}
+
+
+class ImageSizes:
+    # Dimensions of the images pages link to, probed from the public copies and cached on
+    # disk by path, mtime and size. Worker processes get the cache path, not the table,
+    # and report what they probed back through the page result.
+    def __init__(self, public_dir, cache_path=None):
+        self.public_dir = public_dir
+        self.cache_path = cache_path
+        self.sizes = None
+        self.probed = {}
+
+    def __getstate__(self):
+        return {"public_dir": self.public_dir, "cache_path": self.cache_path}
+
+    def __setstate__(self, state):
+        self.__init__(state["public_dir"], state["cache_path"])
+
+    def load(self):
+        if self.sizes is None:
+            sizes = _loaded.get(self.cache_path)
+            if sizes is None:
+                sizes = {}
+                if self.cache_path is not None:
+                    try:
+                        with open(self.cache_path, "r") as f:
+                            sizes = json.load(f)
+                    except (FileNotFoundError, ValueError):
+                        pass
+                _loaded[self.cache_path] = sizes
+            self.sizes = sizes
+        return self.sizes
+
+    def resolve(self, url):
+        # the public file behind a root-relative url, or None for anything else
+        if not url.startswith("/") or url.startswith("//"):
+            return None
+        path = os.path.join(self.public_dir, split_url(url)[0].lstrip("/"))
+        return path if os.path.isfile(path) else None
+
+    def size(self, path, probed=None):
+        # (width, height) of a local image, or None if its format is not one we can read;
+        # a fresh probe is also added to `probed`
+        stat = os.stat(path)
+        sizes = self.load()
+        entry = sizes.get(path)
+        if entry is None or entry[:2] != [stat.st_mtime_ns, stat.st_size]:
+            try:
+                dimensions = probe_image(path)
+            except (OSError, struct.error):
+                dimensions = None
+            entry = [stat.st_mtime_ns, stat.st_size] + (list(dimensions) if dimensions else [None, None])
+            sizes[path] = entry
+            self.probed[path] = entry
+            if probed is not None:
+                probed[path] = entry
+        return None if entry[2] is None else (entry[2], entry[3])
+
+    def update(self, probed):
+        # entries probed in a worker process
+        self.load().update(probed)
+        self.probed.update(probed)
+
+    def save(self):
+        if self.cache_path is None or not self.probed:
+            return
+        sizes = self.load()
+        # drop images that no longer exist
+        for path in [path for path in sizes if not os.path.exists(path)]:
+            del sizes[path]
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        # sharded builds on one machine save concurrently; the last whole-file replace wins
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(sizes, f, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+        self.probed = {}
+
+
+def add_image_sizes(node, images, urls=None):
+    # Gives every <img> that resolves to a local file loading="lazy" and decoding="async",
+    # plus width and height when the file's header says. Returns what this call probed.
+    probed = {}
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(children)
+            continue
+        if getattr(node, "tag", None) != "img" or not node.props or "src" not in node.props:
+            continue
+        src = node.props["src"]
+        if urls is not None and urls.fingerprints:
+            path, suffix = split_url(src)
+            src = urls.fingerprints.get(path, path) + suffix
+        path = images.resolve(src)
+        if path is None:
+            continue
+        dimensions = images.size(path, probed)
+        if dimensions is not None:
+            node.props.setdefault("width", str(dimensions[0]))
+            node.props.setdefault("height", str(dimensions[1]))
+        node.props.setdefault("loading", "lazy")
+        node.props.setdefault("decoding", "async")
+    return probed
@@ -1,32 +1,318 @@
+import argparse
 import os
 import shutil
-import sys
+from concurrent.futures import ProcessPoolExecutor
 
-from copystatic import copy_files_recursive
+from compress import precompress, remove_compressed
+from copystatic import asset_map, sync_files, write_asset_manifest
+from feeds import BLOG_SECTION, DEFAULT_PER_PAGE, FEED_NAME, SITEMAP_NAME, PageMetadata, remove_aggregates, write_aggregates
 from gencontent import generate_pages_recursive
+from imagesize import ImageSizes
+from manifest import BuildManifest
+from parsecache import DEFAULT_MAX_BYTES, ParseCache
+from pipeline import PipelineConfig
+from profiler import NULL_PROFILER, Profiler, format_peak_rss
+from search import SEARCH_DIR_NAME, SearchIndex, remove_search_index
+from shard import ShardError, merge_shards, parse_shard, shard_path
+from urls import UrlRewriter
+from walk import load_ignore_rules
+from watch import LiveReload, SiteWatcher, start_server
 
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
+dir_path_cache = "./.cache"
 template_path = "./template.html"
+manifest_path = os.path.join(dir_path_cache, "manifest.json")
+parse_cache_path = os.path.join(dir_path_cache, "parsed")
+asset_manifest_name = "asset-manifest.json"
+image_sizes_path = os.path.join(dir_path_cache, "images.json")
+search_state_path = os.path.join(dir_path_cache, "search.json")
+page_metadata_path = os.path.join(dir_path_cache, "pages.json")
+dir_path_shards = "./shards"
+ignore_file_path = "./.ssgignore"
 default_basepath = "/"
 
 
-def main():
-    basepath = default_basepath
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the static site into the public directory.")
+    parser.add_argument("basepath", nargs="?", default=default_basepath)
+    parser.add_argument("--site-url", default="", help="make links absolute, e.g. https://example.com")
+    parser.add_argument("--asset-prefix", default="", help="serve images and other files from this url, e.g. a CDN")
+    parser.add_argument("--full", action="store_true", help="ignore the build manifest and rebuild every page")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="generate pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--hash-static", action="store_true", help="compare static files by content hash, not just size and mtime")
+    parser.add_argument(
+        "--profile", nargs="?", const="build-profile", metavar="PREFIX",
+        help="write per-phase timings to PREFIX.json and a Chrome trace to PREFIX.trace.json",
+    )
+    parser.add_argument("--async", dest="use_async", action="store_true", help="overlap reads, rendering and writes with asyncio")
+    parser.add_argument("--read-ahead", type=int, default=16, help="sources read ahead of rendering with --async")
+    parser.add_argument("--render-ahead", type=int, default=16, help="pages rendered ahead of writing with --async")
+    parser.add_argument("--io-workers", type=int, default=8, help="threads for reads and writes with --async")
+    parser.add_argument(
+        "--cache-size", type=int, default=DEFAULT_MAX_BYTES >> 20, metavar="MB",
+        help="size limit for the parsed-page cache (0 disables it)",
+    )
+    parser.add_argument("--clear-cache", action="store_true", help="empty the parsed-page cache and exit")
+    parser.add_argument(
+        "--no-image-sizes", dest="image_sizes", action="store_false",
+        help="don't add width, height and lazy loading to local images",
+    )
+    parser.add_argument(
+        "--stream-over", type=int, default=32, metavar="MB",
+        help="convert sources bigger than this block by block instead of in memory (default 32, 0 = always)",
+    )
+    parser.add_argument("--minify", action="store_true", help="strip insignificant whitespace and quotes from pages")
+    parser.add_argument(
+        "--gzip", nargs="?", type=int, const=9, choices=range(1, 10), metavar="LEVEL",
+        help="write .gz copies of text outputs for servers that serve precompressed files (level 1-9, default 9)",
+    )
+    parser.add_argument("--explain", action="store_true", help="print why each page is being rebuilt")
+    parser.add_argument(
+        "--exclude", action="append", default=[], metavar="PATTERN",
+        help=f"leave out content and static files matching a .gitignore-style PATTERN (repeatable; also read from {ignore_file_path})",
+    )
+    parser.add_argument(
+        "--fingerprint", action="store_true",
+        help=f"copy assets to content-hashed names, link pages to them and list them in {asset_manifest_name}",
+    )
+    parser.add_argument(
+        "--search", action="store_true",
+        help=f"write a client-side full-text search index to {dir_path_public}/{SEARCH_DIR_NAME}, updated incrementally",
+    )
+    parser.add_argument(
+        "--blog", action="store_true",
+        help=f"write a paginated {BLOG_SECTION}/ index, {BLOG_SECTION}/{FEED_NAME} and {SITEMAP_NAME} from cached page metadata",
+    )
+    parser.add_argument(
+        "--blog-page-size", type=int, default=DEFAULT_PER_PAGE, metavar="N",
+        help=f"posts per {BLOG_SECTION} index page (default {DEFAULT_PER_PAGE})",
+    )
+    parser.add_argument(
+        "--shard", type=shard_arg, metavar="I/N",
+        help=f"build only shard I of N (by source size) into {dir_path_shards}/shard-I-of-N",
+    )
+    parser.add_argument("--merge", action="store_true", help=f"combine the shards in {dir_path_shards} into {dir_path_public} and exit")
+    parser.add_argument(
+        "--local-shards", type=int, metavar="N",
+        help="build all N shards in parallel local processes, then merge them, as N CI runners would",
+    )
+    parser.add_argument("--watch", action="store_true", help="serve the site, rebuild what changes and reload open pages")
+    parser.add_argument("--port", type=int, default=8888, help="port for --watch (default 8888)")
+    args = parser.parse_args(argv)
+    if args.fingerprint and args.watch:
+        parser.error("--fingerprint is for deployable builds and cannot be combined with --watch")
+    if args.watch and (args.shard or args.local_shards):
+        parser.error("--watch cannot be combined with sharded builds")
+    if args.search and (args.shard or args.local_shards):
+        # each shard would only index its own pages
+        parser.error("--search cannot be combined with sharded builds")
+    if args.blog and (args.shard or args.local_shards):
+        # the index, feed and sitemap list every page, which no single shard has
+        parser.error("--blog cannot be combined with sharded builds")
+    if args.blog_page_size < 1:
+        parser.error("--blog-page-size must be at least 1")
+    return args
 
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
 
-    print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+def shard_arg(text):
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.clear_cache:
+        ParseCache(parse_cache_path).clear()
+        print(f"Cleared {parse_cache_path}")
+        return
+    if args.local_shards:
+        build_local_shards(args, args.local_shards)
+        return
+    if args.merge:
+        merge(args)
+        return
+    build(args, args.shard)
+
+
+def build_local_shards(args, count):
+    # each process stands in for one CI runner
+    with ProcessPoolExecutor(max_workers=count) as executor:
+        list(executor.map(build, [args] * count, [(index, count) for index in range(1, count + 1)]))
+    merge(args)
+
+
+def merge(args):
+    print(f"Merging shards from {dir_path_shards} into {dir_path_public}...")
+    try:
+        merged, files = merge_shards(dir_path_shards, dir_path_public, manifest_path)
+    except ShardError as e:
+        for problem in e.problems:
+            print(f" ! {problem}")
+        raise SystemExit(1)
+    print(f"Merged {len(merged.pages)} page(s) and {files} file(s)")
+
+
+def build(args, shard=None):
+    # a sharded build writes its pages and manifest under its own shard directory
+    public_dir = dir_path_public
+    build_manifest_path = manifest_path
+    profile_prefix = args.profile
+    if shard is not None:
+        public_dir = os.path.join(shard_path(dir_path_shards, shard), "docs")
+        build_manifest_path = os.path.join(shard_path(dir_path_shards, shard), "manifest.json")
+        if profile_prefix:
+            profile_prefix += f".shard-{shard[0]}"
+        print(f"Building shard {shard[0]} of {shard[1]} into {public_dir}")
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    cache = ParseCache(parse_cache_path, args.cache_size << 20) if args.cache_size > 0 else None
+    images = ImageSizes(public_dir, image_sizes_path) if args.image_sizes else None
+    ignore = load_ignore_rules(ignore_file_path, args.exclude)
+    pipeline = None
+    if args.use_async:
+        pipeline = PipelineConfig(args.read_ahead, args.render_ahead, args.io_workers)
+
+    if args.full:
+        print("Deleting public directory...")
+        if os.path.exists(public_dir):
+            shutil.rmtree(public_dir)
+        manifest = BuildManifest(build_manifest_path, public_dir=public_dir)
+    else:
+        manifest = BuildManifest.load(build_manifest_path, public_dir)
+
+    print("Syncing static files to public directory...")
+    with profiler.phase("sync static"):
+        synced = sync_files(
+            dir_path_static, public_dir, manifest.assets, args.hash_static, profiler=profiler,
+            fingerprints=manifest.fingerprints if args.fingerprint else None, ignore=ignore,
+        )
+    for rel_path in synced.copied:
+        from_path = os.path.join(dir_path_static, synced.renamed.get(rel_path, rel_path))
+        print(f" * {from_path} -> {os.path.join(public_dir, rel_path)}")
+    for rel_path in synced.removed:
+        print(f" * removing stale {os.path.join(public_dir, rel_path)}")
+    print(f"Copied {len(synced.copied)} file(s), {len(synced.skipped)} unchanged, {len(synced.removed)} removed")
+    manifest.assets = synced.files
+    manifest.fingerprints = synced.fingerprints
+    manifest.asset_map = asset_map(synced.fingerprints)
+    write_asset_manifest(os.path.join(public_dir, asset_manifest_name), manifest.asset_map)
+    urls = UrlRewriter(args.basepath, args.site_url, args.asset_prefix, manifest.asset_map)
+    search = None
+    if args.search:
+        search = SearchIndex(public_dir, search_state_path, urls.prefix)
+    elif remove_search_index(public_dir, search_state_path):
+        print(f"Removed the search index from {public_dir}")
+    metadata = None
+    if args.blog:
+        metadata = PageMetadata(public_dir, page_metadata_path)
+    elif shard is None:
+        for rel_path in remove_aggregates(public_dir, page_metadata_path):
+            print(f" * removing {os.path.join(public_dir, rel_path)}")
 
     print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
+    try:
+        with profiler.phase("generate content"):
+            generated = generate_pages_recursive(
+                dir_path_content, template_path, public_dir, urls, manifest=manifest, jobs=jobs, profiler=profiler,
+                explain=args.explain, pipeline=pipeline, cache=cache, minify=args.minify, images=images,
+                stream_over=args.stream_over << 20, shard=shard, ignore=ignore, search=search, metadata=metadata,
+            )
+        print(f"Generated {generated} page(s), {len(manifest.seen) - generated} unchanged")
+
+        for dest_path in manifest.stale_outputs():
+            print(f" * removing stale {dest_path}")
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+            manifest.forget(dest_path)
+            if search is not None:
+                search.remove(dest_path)
+            if metadata is not None:
+                metadata.remove(dest_path)
+
+        if search is not None:
+            with profiler.phase("search index"):
+                written = search.save()
+            print(
+                f"Search index: {len(search.pages)} page(s) in {len(search.shards())} shard(s), "
+                f"{len(written)} shard(s) rewritten"
+            )
+
+        if metadata is not None:
+            with profiler.phase("blog index"):
+                aggregates = write_aggregates(metadata, template_path, urls, args.blog_page_size, args.minify)
+            for rel_path in aggregates.written:
+                print(f" * {os.path.join(public_dir, rel_path)}")
+            for rel_path in aggregates.removed:
+                print(f" * removing stale {os.path.join(public_dir, rel_path)}")
+            for rel_path in aggregates.conflicts:
+                print(f" ! {os.path.join(public_dir, rel_path)} is a content page, not generated")
+            print(
+                f"Blog index, feed and sitemap: {len(metadata.posts())} post(s), {len(aggregates.written)} file(s) "
+                f"written, {len(aggregates.unchanged)} unchanged, {len(aggregates.removed)} removed"
+            )
+            if not args.site_url:
+                print(f" ! without --site-url, links in {FEED_NAME} and {SITEMAP_NAME} are not absolute")
+
+        if args.gzip is not None:
+            print("Precompressing text outputs...")
+            with profiler.phase("precompress"):
+                compressed = precompress(public_dir, manifest.compressed, args.gzip, jobs=max(jobs, 4), profiler=profiler)
+            for rel_path in compressed.compressed:
+                print(f" * {os.path.join(public_dir, rel_path)}.gz")
+            manifest.compressed = compressed.state
+            print(
+                f"Compressed {len(compressed.compressed)} file(s), {len(compressed.skipped)} unchanged, "
+                f"{len(compressed.incompressible)} not worth compressing"
+            )
+        elif manifest.compressed:
+            for rel_path in remove_compressed(public_dir, manifest.compressed):
+                print(f" * removing {os.path.join(public_dir, rel_path)}.gz")
+            manifest.compressed = {}
+    finally:
+        # pages that did build are kept even when others failed
+        manifest.save()
+        if cache is not None:
+            cache.prune()
+        if images is not None:
+            images.save()
+        if search is not None and search.pending:
+            # pages that did build are in the manifest, so they have to be in the index too
+            search.save()
+        if metadata is not None:
+            metadata.save()
+        if args.profile:
+            write_profile(profiler, profile_prefix)
+    print(format_peak_rss(workers=jobs > 1))
+
+    if args.watch:
+        watch_site(args, urls, manifest, cache, images, ignore, search, metadata)
+
+
+def write_profile(profiler, prefix):
+    profiler.write(prefix + ".json", prefix + ".trace.json")
+    print(f"Profile written to {prefix}.json and {prefix}.trace.json")
+    for name, total in sorted(profiler.totals().items(), key=lambda item: -item[1]["ms"]):
+        print(f"   {name:<18} {total['ms']:>10.2f} ms {total['bytes']:>12} bytes {total['count']:>6}x")
+
+
+def watch_site(args, urls, manifest, cache=None, images=None, ignore=None, search=None, metadata=None):
+    live_reload = LiveReload()
+    start_server(dir_path_public, args.port, live_reload)
+    watcher = SiteWatcher(
+        dir_path_content, dir_path_static, template_path, dir_path_public, urls, manifest, cache, args.minify, images,
+        args.stream_over << 20, ignore, search, metadata, args.blog_page_size,
+    )
+    print(f"Serving {dir_path_public} on http://localhost:{args.port}/ and watching for changes (Ctrl-C to stop)")
+    try:
+        watcher.run(live_reload)
+    except KeyboardInterrupt:
+        pass
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+
+from urls import as_url_rewriter
+
+
+MANIFEST_VERSION = 2
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def same_path(previous, current):
+    # entries written before paths were normalized may still say "./content/x.md"
+    return previous is not None and os.path.normpath(previous) == os.path.normpath(current)
+
+
+class BuildManifest:
+    def __init__(self, path, pages=None, assets=None, public_dir=None, compressed=None, fingerprints=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        # static files copied into the public directory by the last sync
+        self.assets = assets if assets is not None else []
+        # where root-relative asset urls resolve; without it asset dependencies are not tracked
+        self.public_dir = public_dir
+        # what the last precompress run saw of each text output, see compress.py
+        self.compressed = compressed if compressed is not None else {}
+        # static path -> [size, mtime_ns, fingerprinted path] when assets are fingerprinted
+        self.fingerprints = fingerprints if fingerprints is not None else {}
+        # asset url -> fingerprinted url for this build; set from the static sync
+        self.asset_map = {}
+        self.seen = set()
+        self._hashes = {}
+        self._stamps = {}
+
+    @classmethod
+    def load(cls, path, public_dir=None):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path, public_dir=public_dir)
+        # a manifest from another format version is as good as none
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path, public_dir=public_dir)
+        return cls(
+            path, data.get("pages", {}), data.get("assets", []), public_dir,
+            data.get("compressed", {}), data.get("fingerprints", {}),
+        )
+
+    def reset(self):
+        # start a new build against the same manifest, e.g. on each watch-mode rebuild
+        self.seen = set()
+        self._hashes = {}
+        self._stamps = {}
+
+    def hash_template(self, template_path):
+        # the template is shared by every page, so only hash it once per build
+        if template_path not in self._hashes:
+            self._hashes[template_path] = hash_file(template_path)
+        return self._hashes[template_path]
+
+    def asset_stamp(self, url):
+        # size and mtime of the public copy; sync keeps mtimes, so this tracks the static source.
+        # A fingerprinted asset is stamped with its current name, which is what pages link to.
+        if url in self.asset_map:
+            return self.asset_map[url]
+        if url not in self._stamps:
+            try:
+                stat = os.stat(os.path.join(self.public_dir, url.lstrip("/")))
+                self._stamps[url] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                self._stamps[url] = None
+        return self._stamps[url]
+
+    def forget_stamp(self, url):
+        # the public copy of url changed during this build, e.g. a watch-mode batch
+        self._stamps.pop(url, None)
+
+    def page_entry(self, from_path, template_path, basepath, minify=False, image_sizes=False, search=None):
+        # basepath may also be a UrlRewriter; the other settings are only kept when set.
+        # `search` is the token of the search index the page goes into, see search.py.
+        # Paths are kept normalized, so "./content/x.md" from a build and "content/x.md"
+        # from the watcher are the same source.
+        urls = as_url_rewriter(basepath)
+        entry = {
+            "source": os.path.normpath(from_path),
+            "source_hash": hash_file(from_path),
+            "template": os.path.normpath(template_path),
+            "template_hash": self.hash_template(template_path),
+            "basepath": urls.basepath,
+        }
+        if urls.site_url:
+            entry["site_url"] = urls.site_url
+        if urls.asset_prefix:
+            entry["asset_prefix"] = urls.asset_prefix
+        if minify:
+            entry["minify"] = True
+        if urls.fingerprints:
+            entry["fingerprint"] = True
+        if image_sizes:
+            entry["image_sizes"] = True
+        if search:
+            entry["search"] = search
+        return entry
+
+    def stale_reasons(self, dest_path, entry):
+        # why dest_path needs regenerating; an empty list means it is up to date
+        dest_path = str(dest_path)
+        self.seen.add(dest_path)
+        previous = self.pages.get(dest_path)
+        if previous is None:
+            return ["new page"]
+        reasons = []
+        if not os.path.exists(dest_path):
+            reasons.append("output missing")
+        for key in ("source", "template"):
+            if not same_path(previous.get(key), entry[key]) or previous.get(f"{key}_hash") != entry[f"{key}_hash"]:
+                reasons.append(f"{key} changed")
+        if previous.get("basepath") != entry["basepath"]:
+            reasons.append(f"basepath changed from {previous.get('basepath')} to {entry['basepath']}")
+        for key, label in (("site_url", "site url"), ("asset_prefix", "asset prefix")):
+            if previous.get(key, "") != entry.get(key, ""):
+                reasons.append(f"{label} changed from {previous.get(key, '') or 'none'} to {entry.get(key, '') or 'none'}")
+        for key, label in (("minify", "minify"), ("fingerprint", "asset fingerprinting"), ("image_sizes", "image sizes")):
+            if previous.get(key, False) != entry.get(key, False):
+                reasons.append(f"{label} turned " + ("on" if entry.get(key) else "off"))
+        if previous.get("search") != entry.get("search"):
+            if previous.get("search") and entry.get("search"):
+                reasons.append("search index started over")
+            else:
+                reasons.append("search index turned " + ("on" if entry.get("search") else "off"))
+        if self.public_dir is not None:
+            for url, stamp in sorted(previous.get("assets", {}).items()):
+                current = self.asset_stamp(url)
+                if current != stamp:
+                    change = "removed" if current is None else "added" if stamp is None else "changed"
+                    reasons.append(f"asset {url} {change}")
+        return reasons
+
+    def is_fresh(self, dest_path, entry):
+        return not self.stale_reasons(dest_path, entry)
+
+    def record(self, dest_path, entry, asset_urls=()):
+        dest_path = str(dest_path)
+        self.seen.add(dest_path)
+        entry = dict(entry)
+        if self.public_dir is not None:
+            entry["assets"] = {url: self.asset_stamp(url) for url in asset_urls}
+        self.pages[dest_path] = entry
+
+    def stale_outputs(self):
+        # outputs from the last build whose source is gone
+        return [path for path in self.pages if path not in self.seen]
+
+    def forget(self, dest_path):
+        self.pages.pop(str(dest_path), None)
+
+    def save(self):
+        dir_path = os.path.dirname(self.path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            data = {
+                "version": MANIFEST_VERSION,
+                "pages": self.pages,
+                "assets": self.assets,
+                "compressed": self.compressed,
+                "fingerprints": self.fingerprints,
+            }
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,135 @@
+import re
+
+
+# whitespace next to these never shows up in the rendered page
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "body", "br", "dd", "div", "dl", "dt", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "head", "header", "hr", "html", "li",
+    "main", "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "title",
+    "tr", "ul",
+}
+# contents are passed through untouched
+RAW_TAGS = {"pre", "code", "textarea", "script", "style"}
+
+TOKEN_RE = re.compile(r"<!--.*?-->|<[A-Za-z/!?](?:[^>\"']|\"[^\"]*\"|'[^']*')*>", re.S)
+TAG_START_RE = re.compile(r"<(?:[A-Za-z/!?]|$)")
+TAG_NAME_RE = re.compile(r"</?([A-Za-z][A-Za-z0-9-]*)")
+ATTR_RE = re.compile(r"\s+([^\s\"'>/=]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'=<>`]+)))?")
+TAG_END_RE = re.compile(r"\s*(/?)>")
+UNQUOTED_RE = re.compile(r"[^\s\"'=<>`]+")
+WHITESPACE_RE = re.compile(r"[ \t\n\r\f]+")
+
+
+def minify_tag(tag):
+    # drops attribute quotes where HTML allows it; anything unexpected is kept as written
+    match = TAG_NAME_RE.match(tag)
+    if match is None or tag.startswith("</"):
+        return tag
+    parts = [match.group(0)]
+    pos = match.end()
+    attrs = []
+    while (attr := ATTR_RE.match(tag, pos)) is not None:
+        attrs.append(attr)
+        pos = attr.end()
+    end = TAG_END_RE.fullmatch(tag, pos)
+    if end is None:
+        return tag
+    for i, attr in enumerate(attrs):
+        name, double, single, bare = attr.groups()
+        value = double if double is not None else single if single is not None else bare
+        if value is None:
+            parts.append(f" {name}")
+        # a trailing "/" (or one before "/>") would be read as part of the value
+        elif UNQUOTED_RE.fullmatch(value) and not value.endswith("/") and not (end.group(1) and i == len(attrs) - 1):
+            parts.append(f" {name}={value}")
+        elif single is not None:
+            parts.append(f" {name}='{value}'")
+        else:
+            parts.append(f' {name}="{value}"')
+    parts.append("/>" if end.group(1) else ">")
+    return "".join(parts)
+
+
+class MinifyStream:
+    # Minifies html as it is written through, in whatever chunks it arrives: collapses
+    # whitespace runs outside <pre>/<code>/<script>/<style>/<textarea>, drops whitespace
+    # next to block tags and unquotes attributes. Call close() at the end.
+    def __init__(self, stream):
+        self.write_out = stream.append if isinstance(stream, list) else stream.write
+        self.pending = ""
+        self.space = False
+        self.after_block = True
+        self.raw = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def emit(self, text):
+        self.bytes_out += len(text)
+        self.write_out(text)
+
+    def write(self, chunk):
+        self.bytes_in += len(chunk)
+        data = self.pending + chunk
+        pos = 0
+        for match in TOKEN_RE.finditer(data):
+            if match.start() > pos:
+                self.text(data[pos:match.start()])
+            self.tag(match.group(0))
+            pos = match.end()
+        # an unfinished tag waits for the next chunk
+        rest = data[pos:]
+        start = TAG_START_RE.search(rest)
+        if start is None:
+            self.pending = ""
+        else:
+            self.pending = rest[start.start():]
+            rest = rest[:start.start()]
+        if rest:
+            self.text(rest)
+
+    def text(self, text):
+        if self.raw:
+            self.emit(text)
+            self.after_block = False
+            return
+        text = WHITESPACE_RE.sub(" ", text)
+        if text.startswith(" "):
+            self.space = True
+            text = text[1:]
+        if not text:
+            return
+        if self.space and not self.after_block:
+            self.emit(" ")
+        self.space = text.endswith(" ")
+        if self.space:
+            text = text[:-1]
+        self.emit(text)
+        self.after_block = False
+
+    def tag(self, tag):
+        if tag.startswith("<!--"):
+            # a comment renders as nothing, so the whitespace around it stays as if it were not there
+            self.emit(tag)
+            return
+        if tag.startswith("<!") or tag.startswith("<?"):
+            # <!DOCTYPE html> and the like come before any text
+            name, closing, block = "!", False, True
+        else:
+            match = TAG_NAME_RE.match(tag)
+            name, closing = match.group(1).lower(), tag.startswith("</")
+            block = name in BLOCK_TAGS
+        if self.space and not block and not self.after_block:
+            self.emit(" ")
+        self.space = False
+        if closing and name in RAW_TAGS and self.raw:
+            self.raw -= 1
+        self.emit(tag if name == "!" else minify_tag(tag))
+        if not closing and name in RAW_TAGS:
+            self.raw += 1
+        self.after_block = block
+
+    def close(self):
+        # a dangling "<" is just text; trailing whitespace is dropped
+        if self.pending:
+            pending, self.pending = self.pending, ""
+            self.text(pending)
@@ -0,0 +1,107 @@
+import hashlib
+import marshal
+import os
+import shutil
+import sys
+import zlib
+
+from htmlnode import HTMLNode, LeafNode, ParentNode
+
+
+# bump whenever markdown_to_html_node can produce a different tree for the same source
+PARSER_VERSION = 1
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+def encode_node(node):
+    # leaves become (tag, value, props) and parents (tag, [children], props);
+    # a str in the middle slot marks a leaf
+    if isinstance(node, ParentNode):
+        return (node.tag, [encode_node(child) for child in node.children], node.props)
+    return (node.tag, node.value, node.props)
+
+
+def decode_node(data):
+    tag, middle, props = data
+    if isinstance(middle, list):
+        return ParentNode(tag, [decode_node(child) for child in middle], props)
+    return LeafNode(tag, middle, props)
+
+
+class ParseCache:
+    # Parsed pages on disk, keyed by a hash of the markdown and the parser version,
+    # so a template or basepath change never reparses an unchanged source.
+    # Plain data, so it can be handed to worker processes.
+    def __init__(self, dir_path, max_bytes=DEFAULT_MAX_BYTES):
+        self.dir_path = dir_path
+        self.max_bytes = max_bytes
+
+    def key(self, markdown_content):
+        digest = hashlib.sha256(f"{PARSER_VERSION}:{sys.version_info[:2]}:".encode())
+        digest.update(markdown_content.encode())
+        return digest.hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.dir_path, key[:2], key)
+
+    def get(self, markdown_content):
+        # returns (node, title, asset urls), or None on a miss
+        path = self.entry_path(self.key(markdown_content))
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            tree, title, assets = marshal.loads(zlib.decompress(data))
+        except (OSError, ValueError, EOFError, TypeError, zlib.error):
+            return None
+        try:
+            # the mtime doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return decode_node(tree), title, assets
+
+    def put(self, markdown_content, node, title, assets):
+        if not isinstance(node, HTMLNode):
+            return
+        path = self.entry_path(self.key(markdown_content))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(marshal.dumps((encode_node(node), title, list(assets))), 1)
+        # worker processes may race on the same entry; whole-file replace keeps readers safe
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def entries(self):
+        entries = []
+        if not os.path.isdir(self.dir_path):
+            return entries
+        for prefix in os.scandir(self.dir_path):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def prune(self):
+        # evict least recently used entries until the cache fits in max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        if os.path.exists(self.dir_path):
+            shutil.rmtree(self.dir_path)
@@ -0,0 +1,112 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from gencontent import RenderJob, _generate_page_job, _render_page_job, is_streamed, read_source, write_output
+
+
+class PipelineConfig:
+    def __init__(self, read_ahead=16, render_ahead=16, io_workers=8):
+        # sources read but not yet rendered
+        self.read_ahead = read_ahead
+        # pages rendered (or rendering) but not yet written
+        self.render_ahead = render_ahead
+        # threads for blocking reads and writes, which is also the number of writers
+        self.io_workers = io_workers
+
+    def __repr__(self):
+        return (
+            f"PipelineConfig(read_ahead={self.read_ahead}, render_ahead={self.render_ahead}, "
+            f"io_workers={self.io_workers})"
+        )
+
+
+def run_pipeline(work, config, jobs, profiler, done):
+    # Builds the pages in `work` (the PageJobs from generate_pages_recursive, taken only as
+    # the read queue has room) and calls done(job, (error, events, result)) as each finishes,
+    # in the order they finish.
+    asyncio.run(_pipeline(work, config, jobs, profiler, done))
+
+
+async def _pipeline(work, config, jobs, profiler, done):
+    loop = asyncio.get_running_loop()
+    work = iter(work)
+    read_queue = asyncio.Queue(max(1, config.read_ahead))
+    render_queue = asyncio.Queue(max(1, config.render_ahead))
+    writers = max(1, config.io_workers)
+
+    def fail(job, error, events=()):
+        done(job, (f"{type(error).__name__}: {error}" if isinstance(error, Exception) else error, events, None))
+
+    async def read_sources():
+        while True:
+            # making a job hashes its source for the manifest's staleness check, so jobs are
+            # taken off the event loop, where that read would hold up every other stage
+            job = await loop.run_in_executor(io_pool, next, work, None)
+            if job is None:
+                break
+            if is_streamed(job.from_path, job.stream_over):
+                # too big to read ahead; it is converted and written in one go by a render worker
+                await read_queue.put((job, None))
+                continue
+            # the queue bound is what limits how far reads run ahead
+            await read_queue.put((job, loop.run_in_executor(io_pool, read_source, job.from_path, profiler)))
+        await read_queue.put(None)
+
+    # One page per call in the stages below, so nothing of a finished page stays referenced
+    # from a stage's locals while it waits for the next one.
+    async def render_next():
+        item = await read_queue.get()
+        if item is None:
+            return False
+        job, reading = item
+        if reading is None:
+            await render_queue.put((job, loop.run_in_executor(cpu_pool, _generate_page_job, job)))
+            return True
+        try:
+            markdown_content = await reading
+        except Exception as e:
+            fail(job, e)
+            return True
+        render_job = RenderJob(
+            markdown_content, job.template_path, job.basepath, str(job.from_path), job.profile, job.cache, job.minify,
+            job.images, job.search,
+        )
+        await render_queue.put((job, loop.run_in_executor(cpu_pool, _render_page_job, render_job)))
+        return True
+
+    async def render_pages():
+        while await render_next():
+            pass
+        for _ in range(writers):
+            await render_queue.put(None)
+
+    async def write_next():
+        item = await render_queue.get()
+        if item is None:
+            return False
+        job, rendering = item
+        outcome = await rendering
+        if len(outcome) == 3:
+            # a streamed page, already written
+            done(job, outcome)
+            return True
+        error, events, html, result = outcome
+        if error is not None:
+            fail(job, error, events)
+            return True
+        print(f" * {job.from_path} {job.template_path} -> {job.dest_path}")
+        try:
+            await loop.run_in_executor(io_pool, write_output, job.dest_path, html, str(job.from_path), profiler)
+        except Exception as e:
+            fail(job, e, events)
+            return True
+        done(job, (None, events, result))
+        return True
+
+    async def write_pages():
+        while await write_next():
+            pass
+
+    cpu_pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else ThreadPoolExecutor(max_workers=1)
+    with ThreadPoolExecutor(max_workers=writers) as io_pool, cpu_pool:
+        await asyncio.gather(read_sources(), render_pages(), *(write_pages() for _ in range(writers)))
@@ -0,0 +1,179 @@
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows; peak_rss() reports nothing there
+    resource = None
+
+
+class Profiler:
+    def __init__(self):
+        self.events = []
+        self.start = time.perf_counter_ns()
+
+    def phase(self, name, page=None):
+        return _Phase(self, name, page)
+
+    def extend(self, events):
+        # events recorded by a worker process
+        self.events.extend(events)
+
+    def totals(self):
+        totals = {}
+        for name, _, _, duration, size, _, _ in self.events:
+            total = totals.setdefault(name, {"ms": 0.0, "bytes": 0, "count": 0})
+            total["ms"] += duration / 1e6
+            total["bytes"] += size
+            total["count"] += 1
+        return totals
+
+    def report(self):
+        pages = {}
+        for name, page, _, duration, size, _, _ in self.events:
+            if page is None:
+                continue
+            phases = pages.setdefault(page, {})
+            phase = phases.setdefault(name, {"ms": 0.0, "bytes": 0})
+            phase["ms"] += duration / 1e6
+            phase["bytes"] += size
+        self_rss, worker_rss = peak_rss() or (None, None)
+        return {
+            "wall_ms": (time.perf_counter_ns() - self.start) / 1e6,
+            "peak_rss_bytes": self_rss,
+            "peak_worker_rss_bytes": worker_rss,
+            "totals": self.totals(),
+            "pages": pages,
+        }
+
+    def trace_events(self):
+        # Chrome trace-event format, timestamps in microseconds
+        events = []
+        for name, page, start, duration, size, pid, tid in self.events:
+            args = {"bytes": size}
+            if page is not None:
+                args["page"] = page
+            events.append({
+                "name": name,
+                "cat": "build",
+                "ph": "X",
+                "ts": (start - self.start) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, report_path, trace_path):
+        with open(report_path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+        with open(trace_path, "w") as f:
+            json.dump(self.trace_events(), f)
+
+
+def peak_rss():
+    # (this process, largest finished worker process) peak resident set size in bytes,
+    # or None where the platform doesn't say
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+
+def format_peak_rss(workers=False):
+    # `workers` says whether the build ran worker processes; without any, the children's
+    # figure is whatever earlier child processes left behind, so it is not shown
+    rss = peak_rss()
+    if rss is None:
+        return "Peak memory: unknown on this platform"
+    text = f"Peak memory: {rss[0] / (1 << 20):.1f} MB"
+    if workers and rss[1]:
+        text += f", largest worker {rss[1] / (1 << 20):.1f} MB"
+    return text
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "page", "start", "bytes")
+
+    def __init__(self, profiler, name, page):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+        self.bytes = 0
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        self.profiler.events.append(
+            (self.name, self.page, self.start, end - self.start, self.bytes, os.getpid(), threading.get_ident())
+        )
+        return False
+
+
+class TimedStream:
+    # times the writes into a stream; they show up as one phase with the total write time
+    def __init__(self, stream, profiler, name, page=None):
+        self.stream = stream
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+        self.first_start = None
+        self.duration = 0
+        self.bytes = 0
+
+    def write(self, chunk):
+        start = time.perf_counter_ns()
+        self.stream.write(chunk)
+        self.duration += time.perf_counter_ns() - start
+        self.bytes += len(chunk)
+        if self.first_start is None:
+            self.first_start = start
+
+    def finish(self):
+        if self.first_start is not None:
+            self.profiler.events.append(
+                (self.name, self.page, self.first_start, self.duration, self.bytes, os.getpid(), threading.get_ident())
+            )
+
+
+class NullProfiler:
+    # stands in when profiling is off; every phase is the same do-nothing object
+    events = ()
+
+    def phase(self, name, page=None):
+        return _NULL_PHASE
+
+    def extend(self, events):
+        pass
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def add_bytes(self, count):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+NULL_PROFILER = NullProfiler()
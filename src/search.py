@@ -0,0 +1,299 @@
+import json
+import os
+import re
+import shutil
+import uuid
+
+
+SEARCH_VERSION = 1
+SEARCH_DIR_NAME = "search-index"
+# terms are sharded by their first characters; two keeps shards small for sites of any size
+DEFAULT_PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 40
+# a match in the title counts as this many in the body
+TITLE_WEIGHT = 5
+TERM_RE = re.compile(r"[^\W_]+")
+
+# Loaded by pages that offer search: fetches index.json once, then only the shards of the
+# query's terms, and returns the pages containing every term, best first.
+SEARCH_CLIENT = """\
+(function () {
+  var root = document.currentScript.src.replace(/[^/]*$/, "");
+  var meta = null;
+  var shards = {};
+  function load(name) {
+    return fetch(root + name).then(function (response) { return response.ok ? response.json() : {}; });
+  }
+  window.siteSearch = async function (query) {
+    meta = meta || await load("index.json");
+    var terms = (query.toLowerCase().match(/[\\p{L}\\p{N}]+/gu) || []).filter(function (term) {
+      return term.length >= meta.min_term_length;
+    });
+    var scores = null;
+    for (var term of terms) {
+      var prefix = term.slice(0, meta.prefix_length);
+      if (meta.shards.indexOf(prefix) === -1) return [];
+      shards[prefix] = shards[prefix] || load("terms/" + encodeURIComponent(prefix) + ".json");
+      var postings = (await shards[prefix])[term] || [];
+      var found = {};
+      for (var i = 0; i < postings.length; i += 2) found[postings[i]] = postings[i + 1];
+      if (scores === null) {
+        scores = found;
+        continue;
+      }
+      for (var id in scores) {
+        if (id in found) scores[id] += found[id];
+        else delete scores[id];
+      }
+    }
+    return Object.keys(scores || {}).sort(function (a, b) { return scores[b] - scores[a]; }).map(function (id) {
+      return {url: meta.base + meta.docs[id][0], title: meta.docs[id][1], score: scores[id]};
+    });
+  };
+})();
+"""
+
+
+def tokenize(text):
+    return [
+        term for term in TERM_RE.findall(text.lower()) if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH
+    ]
+
+
+def page_terms(node, title=""):
+    # {term: count} for a page, from the text leaves its TextNodes became (and image alt
+    # text); code blocks are left out, title terms count TITLE_WEIGHT times
+    terms = {}
+    stack = [node] if node is not None else []
+    while stack:
+        node = stack.pop()
+        children = getattr(node, "children", None)
+        if children:
+            if node.tag != "pre":
+                stack.extend(children)
+            continue
+        text = getattr(node, "value", None) or ""
+        if getattr(node, "tag", None) == "img" and node.props:
+            text = node.props.get("alt", "")
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+    for term in tokenize(title):
+        terms[term] = terms.get(term, 0) + TITLE_WEIGHT
+    return terms
+
+
+def merge_terms(terms, more):
+    for term, count in more.items():
+        terms[term] = terms.get(term, 0) + count
+    return terms
+
+
+def page_url(rel_path):
+    # "blog/tom/index.html" -> "blog/tom/", relative to the site's base url
+    rel_path = rel_path.replace(os.sep, "/")
+    if rel_path == "index.html" or rel_path.endswith("/index.html"):
+        return rel_path[:-len("index.html")]
+    return rel_path
+
+
+class SearchIndex:
+    # An inverted index of the site's pages, written to public_dir/search-index as:
+    #   index.json            base url, shard list and id -> [url, title] for every page
+    #   terms/<prefix>.json   term -> [page id, count, page id, count, ...] for terms with that prefix
+    #   search.js             the client, see SEARCH_CLIENT
+    # The state file remembers each page's id and the shards it has postings in, so a build
+    # only reads and rewrites the shards that its changed and removed pages touch.
+    # `token` names this index; pages record it, so when the index has to start over
+    # (no state, a different layout, or its files gone) every page is indexed again.
+    def __init__(self, public_dir, state_path, base="/", prefix_length=DEFAULT_PREFIX_LENGTH):
+        self.public_dir = public_dir
+        self.dir_path = os.path.join(public_dir, SEARCH_DIR_NAME)
+        self.state_path = state_path
+        self.base = base
+        self.prefix_length = prefix_length
+        self.changed = {}
+        self.removed = set()
+        self.written = []
+        state = self.load_state()
+        self.fresh = state is None
+        if state is None:
+            state = {"token": uuid.uuid4().hex[:12], "next_id": 0, "pages": {}}
+        self.token = state["token"]
+        self.next_id = state["next_id"]
+        # rel output path -> [id, url, title, [shard prefixes]]
+        self.pages = state["pages"]
+
+    def load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            with open(os.path.join(self.dir_path, "index.json"), "r") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if (
+            state.get("version") != SEARCH_VERSION or state.get("prefix_length") != self.prefix_length
+            or meta.get("token") != state.get("token")
+        ):
+            return None
+        return state
+
+    def rel_path(self, dest_path):
+        return os.path.relpath(dest_path, self.public_dir)
+
+    def add(self, dest_path, title, terms):
+        # a page built this run; its postings replace whatever it had before
+        rel_path = self.rel_path(dest_path)
+        self.removed.discard(rel_path)
+        self.changed[rel_path] = (title, terms)
+
+    def remove(self, dest_path):
+        rel_path = self.rel_path(dest_path)
+        self.changed.pop(rel_path, None)
+        if rel_path in self.pages:
+            self.removed.add(rel_path)
+
+    @property
+    def pending(self):
+        # changes not saved yet
+        return bool(self.changed or self.removed)
+
+    def prefix(self, term):
+        return term[:self.prefix_length]
+
+    def save(self):
+        # writes the shards touched since the last save; returns their prefixes
+        self.written = []
+        if not self.changed and not self.removed and not self.fresh:
+            if self.meta() != self.read_meta():
+                self.write_json("index.json", self.meta())
+            return self.written
+        if self.fresh and os.path.exists(self.dir_path):
+            shutil.rmtree(self.dir_path)
+
+        affected = set()
+        stale_ids = set()
+        for rel_path in self.removed | set(self.changed):
+            if rel_path in self.pages:
+                stale_ids.add(self.pages[rel_path][0])
+                affected.update(self.pages[rel_path][3])
+        for rel_path in self.removed:
+            del self.pages[rel_path]
+
+        # changed pages, grouped by shard: prefix -> {term: [(id, count), ...]}
+        additions = {}
+        for rel_path, (title, terms) in sorted(self.changed.items()):
+            if rel_path in self.pages:
+                page_id = self.pages[rel_path][0]
+            else:
+                page_id = self.next_id
+                self.next_id += 1
+            prefixes = set()
+            for term, count in terms.items():
+                prefix = self.prefix(term)
+                prefixes.add(prefix)
+                additions.setdefault(prefix, {}).setdefault(term, []).append((page_id, count))
+            self.pages[rel_path] = [page_id, page_url(rel_path), title, sorted(prefixes)]
+            affected.update(prefixes)
+
+        for prefix in sorted(affected):
+            self.update_shard(prefix, stale_ids, additions.get(prefix, {}))
+        self.write_json("index.json", self.meta())
+        self.write_client()
+        self.save_state()
+        self.changed = {}
+        self.removed = set()
+        self.fresh = False
+        return self.written
+
+    def update_shard(self, prefix, stale_ids, additions):
+        name = os.path.join("terms", prefix + ".json")
+        path = os.path.join(self.dir_path, name)
+        shard = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                shard = json.load(f)
+        for term in list(shard):
+            flat = shard[term]
+            pairs = [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2) if flat[i] not in stale_ids]
+            if pairs:
+                shard[term] = pairs
+            else:
+                del shard[term]
+        for term, pairs in additions.items():
+            shard[term] = shard.get(term, []) + pairs
+        if not shard:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        shard = {term: [value for pair in sorted(pairs) for value in pair] for term, pairs in shard.items()}
+        self.write_json(name, shard)
+        self.written.append(prefix)
+
+    def shards(self):
+        return sorted({prefix for page in self.pages.values() for prefix in page[3]})
+
+    def meta(self):
+        return {
+            "version": SEARCH_VERSION,
+            "token": self.token,
+            "base": self.base,
+            "prefix_length": self.prefix_length,
+            "min_term_length": MIN_TERM_LENGTH,
+            "shards": self.shards(),
+            "docs": {str(page[0]): [page[1], page[2]] for page in self.pages.values()},
+        }
+
+    def read_meta(self):
+        try:
+            with open(os.path.join(self.dir_path, "index.json"), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_json(self, name, data):
+        path = os.path.join(self.dir_path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def write_client(self):
+        path = os.path.join(self.dir_path, "search.js")
+        try:
+            with open(path, "r") as f:
+                if f.read() == SEARCH_CLIENT:
+                    return
+        except FileNotFoundError:
+            pass
+        with open(path, "w") as f:
+            f.write(SEARCH_CLIENT)
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "version": SEARCH_VERSION,
+                    "token": self.token,
+                    "prefix_length": self.prefix_length,
+                    "next_id": self.next_id,
+                    "pages": self.pages,
+                },
+                f, sort_keys=True,
+            )
+        os.replace(tmp_path, self.state_path)
+
+
+def remove_search_index(public_dir, state_path):
+    # for builds with search turned off; only an index this build wrote is removed
+    if not os.path.exists(state_path):
+        return False
+    dir_path = os.path.join(public_dir, SEARCH_DIR_NAME)
+    if os.path.exists(dir_path):
+        shutil.rmtree(dir_path)
+    os.remove(state_path)
+    return True
@@ -0,0 +1,139 @@
+import filecmp
+import os
+import re
+import shutil
+from pathlib import Path
+
+from copystatic import list_files
+from manifest import BuildManifest
+
+
+SHARD_DIR_RE = re.compile(r"shard-(\d+)-of-(\d+)")
+# page settings every shard has to agree on for the merged site to be consistent
+SHARED_SETTINGS = ("template_hash", "basepath", "site_url", "asset_prefix", "minify", "fingerprint", "image_sizes")
+
+
+class ShardError(Exception):
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__(f"cannot merge shards: {len(problems)} problem(s): " + "; ".join(problems))
+
+
+def parse_shard(text):
+    # "2/4" -> (2, 4); shards are numbered from 1 like CI runner indexes
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"shard must look like I/N, got {text!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"shard {index}/{count} is out of range")
+    return index, count
+
+
+def shard_path(shard_root, shard):
+    index, count = shard
+    return os.path.join(shard_root, f"shard-{index}-of-{count}")
+
+
+def partition(pages, count, content_dir):
+    # Splits (from_path, dest_path) pairs into `count` lists of about equal source size:
+    # biggest first onto the lightest shard. Sizes and content-relative paths are the same
+    # on every checkout, so every machine computes the same split.
+    weighted = sorted(
+        (-max(os.path.getsize(from_path), 1), os.path.relpath(from_path, content_dir), from_path, dest_path)
+        for from_path, dest_path in pages
+    )
+    loads = [0] * count
+    shards = [[] for _ in range(count)]
+    for negative_size, _, from_path, dest_path in weighted:
+        lightest = min(range(count), key=lambda i: (loads[i], i))
+        shards[lightest].append((from_path, dest_path))
+        loads[lightest] -= negative_size
+    return shards
+
+
+def select_shard(pages, shard, content_dir):
+    # this shard's pages, in their original order
+    index, count = shard
+    chosen = set(partition(pages, count, content_dir)[index - 1])
+    return [page for page in pages if page in chosen]
+
+
+def find_shards(shard_root):
+    # {index: directory} for a complete set of shards under shard_root
+    found = {}
+    counts = set()
+    for name in sorted(os.listdir(shard_root)) if os.path.isdir(shard_root) else []:
+        match = SHARD_DIR_RE.fullmatch(name)
+        if match:
+            index, count = int(match.group(1)), int(match.group(2))
+            found[index] = os.path.join(shard_root, name)
+            counts.add(count)
+    if not found:
+        raise ShardError([f"no shards found in {shard_root}"])
+    if len(counts) > 1:
+        raise ShardError([f"shards from different splits: {', '.join(f'of {n}' for n in sorted(counts))}"])
+    (count,) = counts
+    missing = [str(index) for index in range(1, count + 1) if index not in found]
+    if missing:
+        raise ShardError([f"missing shard(s) {', '.join(missing)} of {count}"])
+    return found
+
+
+def merge_shards(shard_root, public_dir, manifest_path):
+    # Combines every shard's partial output and manifest into public_dir and one manifest.
+    # Files may appear in several shards (static assets do) only with identical content;
+    # a page may only be built by one shard, and all shards must share the same settings.
+    shards = find_shards(shard_root)
+    problems = []
+    files = {}
+    pages = {}
+    settings = {}
+    manifests = []
+    for index, shard_dir in sorted(shards.items()):
+        shard_public = os.path.join(shard_dir, "docs")
+        shard_manifest = os.path.join(shard_dir, "manifest.json")
+        if not os.path.exists(shard_manifest):
+            problems.append(f"shard {index} has no manifest")
+            continue
+        manifest = BuildManifest.load(shard_manifest, shard_public)
+        manifests.append(manifest)
+
+        for rel_path in list_files(shard_public) if os.path.isdir(shard_public) else []:
+            path = os.path.join(shard_public, rel_path)
+            if rel_path not in files:
+                files[rel_path] = (index, path)
+            elif not filecmp.cmp(files[rel_path][1], path, shallow=False):
+                problems.append(f"{rel_path} differs between shards {files[rel_path][0]} and {index}")
+
+        for dest_path, entry in manifest.pages.items():
+            rel_path = os.path.relpath(dest_path, shard_public)
+            if rel_path in pages:
+                problems.append(f"{rel_path} was built by shards {pages[rel_path][0]} and {index}")
+                continue
+            pages[rel_path] = (index, entry)
+            key = tuple(entry.get(name) for name in SHARED_SETTINGS)
+            settings.setdefault(key, index)
+    if len(settings) > 1:
+        problems.append(f"shards {', '.join(str(i) for i in sorted(settings.values()))} were built with different settings")
+    if problems:
+        raise ShardError(problems)
+
+    if os.path.exists(public_dir):
+        shutil.rmtree(public_dir)
+    for rel_path, (_, path) in sorted(files.items()):
+        dest_path = os.path.join(public_dir, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        # copy2 keeps mtimes, which the manifest's asset stamps rely on
+        shutil.copy2(path, dest_path)
+
+    merged = BuildManifest(manifest_path, public_dir=public_dir)
+    # keyed like collect_pages names outputs, so the next unsharded build finds them
+    merged.pages = {str(Path(public_dir, rel_path)): entry for rel_path, (_, entry) in sorted(pages.items())}
+    for manifest in manifests:
+        merged.assets = sorted(set(merged.assets) | set(manifest.assets))
+        merged.fingerprints.update(manifest.fingerprints)
+        merged.compressed.update(manifest.compressed)
+    merged.save()
+    return merged, len(files)
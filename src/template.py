@@ -0,0 +1,87 @@
+import os
+import re
+
+from urls import as_url_rewriter, is_page_url, split_url
+
+
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+URL_ATTR_RE = re.compile(r'\b(href|src)="([^"]*)"')
+
+
+def rewrite_urls(html, urls):
+    # href/src attributes in raw html, for markup that is not an HTMLNode tree
+    if urls is None or not urls.active:
+        return html
+    return URL_ATTR_RE.sub(lambda m: f'{m.group(1)}="{urls.rewrite(m.group(1), m.group(2))}"', html)
+
+
+def template_asset_urls(html):
+    # root-relative files the template itself pulls in, by the same rules as depgraph.collect_asset_urls
+    urls = set()
+    for match in URL_ATTR_RE.finditer(html):
+        name, url = match.groups()
+        path = split_url(url)[0]
+        if not url.startswith("/") or url.startswith("//") or (name == "href" and is_page_url(path)):
+            continue
+        urls.add(path)
+    return sorted(urls)
+
+
+class Template:
+    def __init__(self, source, urls=None):
+        # urls is a UrlRewriter or a basepath; the template's own links are rewritten
+        # once here, node values are rewritten as they render
+        urls = as_url_rewriter(urls)
+        self.urls = urls if urls is not None and urls.active else None
+        self.asset_urls = template_asset_urls(source)
+        source = rewrite_urls(source, self.urls)
+        self.literals = []
+        self.placeholders = []
+        pos = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            self.literals.append(source[pos:match.start()])
+            self.placeholders.append((match.group(1), match.group(0)))
+            pos = match.end()
+        self.literals.append(source[pos:])
+
+    @property
+    def names(self):
+        return [name for name, _ in self.placeholders]
+
+    def render(self, values):
+        parts = []
+        self.render_to(parts, values)
+        return "".join(parts)
+
+    def render_to(self, stream, values):
+        # values are strings or anything with write_html(stream), such as an HTMLNode
+        write = stream.append if isinstance(stream, list) else stream.write
+        write(self.literals[0])
+        for (name, raw), literal in zip(self.placeholders, self.literals[1:]):
+            # unknown placeholders are left in the page untouched
+            value = values.get(name, raw)
+            if isinstance(value, str):
+                write(value)
+            else:
+                value.write_html(stream, self.urls)
+            write(literal)
+
+    def __repr__(self):
+        return f"Template(placeholders={self.names})"
+
+
+_template_cache = {}
+
+
+def load_template(template_path, urls=None):
+    # compiled once per build (and once per worker process), recompiled if the file changes
+    urls = as_url_rewriter(urls)
+    stat = os.stat(template_path)
+    key = (os.path.abspath(template_path), stat.st_mtime_ns, stat.st_size, urls)
+    template = _template_cache.get(key)
+    if template is None:
+        with open(template_path, "r") as f:
+            template = Template(f.read(), urls)
+        _template_cache.clear()
+        _template_cache[key] = template
+    return template
@@ -0,0 +1,28 @@
+import unittest
+
+from benchmark import CORPORA, bench_corpus, compare
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpora_run(self):
+        for name, make_corpus in CORPORA.items():
+            results = bench_corpus(make_corpus(2), repeat=1)
+            self.assertEqual(
+                sorted(results),
+                ["block_to_block_type", "markdown_to_blocks", "markdown_to_html_node", "text_to_textnodes", "to_html"],
+                name,
+            )
+
+    def test_compare(self):
+        baseline = {"results": {"deep_lists": {"to_html": 1.0, "markdown_to_blocks": 1.0, "bytes": 10}}}
+        current = {"results": {"deep_lists": {"to_html": 1.5, "markdown_to_blocks": 1.1, "bytes": 10}}}
+        self.assertEqual(compare(current, baseline), [("deep_lists", "to_html", 1.0, 1.5)])
+        self.assertEqual(compare(current, baseline, threshold=2.0), [])
+
+    def test_compare_ignores_new_stages(self):
+        current = {"results": {"long_paragraphs": {"to_html": 1.0}}}
+        self.assertEqual(compare(current, {"results": {}}), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from blocktype import BlockType, block_to_block_type
+from blocktype import BlockType, block_to_block_type, scan_blocks
+from htmlnode import markdown_to_blocks
 
 class TestBlocktype(unittest.TestCase):
     def test_blocktype_paragraph(self):
@@ -39,5 +40,65 @@ class TestBlocktype(unittest.TestCase):
         actual_type = block_to_block_type(text)
         self.assertEqual(actual_type, expected_type, f"Expected {expected_type}, but got {actual_type}.")
 
+class TestScanBlocks(unittest.TestCase):
+    def test_matches_markdown_to_blocks(self):
+        md = """
+# Heading
+
+This is a paragraph
+  on two lines
+
+> quote
+> more
+
+- one
+- two
+
+1. first
+2. second
+
+```
+code
+```
+"""
+        expected = [(block_to_block_type(block), block.split("\n")) for block in markdown_to_blocks(md)]
+        self.assertEqual(list(scan_blocks(md)), expected)
+
+    def test_fenced_code_with_blank_lines(self):
+        md = "intro\n\n```\nline one\n\n\nline two\n```\n\nafter"
+        self.assertEqual(
+            list(scan_blocks(md)),
+            [
+                (BlockType.PARAGRAPH, ["intro"]),
+                (BlockType.CODE, ["```", "line one", "", "", "line two", "```"]),
+                (BlockType.PARAGRAPH, ["after"]),
+            ],
+        )
+
+    def test_unclosed_fence(self):
+        md = "```\nnot code\n\n- item"
+        self.assertEqual(
+            list(scan_blocks(md)),
+            [
+                (BlockType.PARAGRAPH, ["```", "not code"]),
+                (BlockType.UNORDERED_LIST, ["- item"]),
+            ],
+        )
+
+    def test_whitespace_only_lines_separate_blocks(self):
+        md = "- a\n   \n- b"
+        self.assertEqual(
+            list(scan_blocks(md)),
+            [(BlockType.UNORDERED_LIST, ["- a"]), (BlockType.UNORDERED_LIST, ["- b"])],
+        )
+
+    def test_accepts_iterable_of_lines(self):
+        lines = iter(["# Title\n", "\n", "1. a\n", "3. b\n"])
+        self.assertEqual(
+            list(scan_blocks(lines)),
+            [(BlockType.HEADING, ["# Title"]), (BlockType.PARAGRAPH, ["1. a", "3. b"])],
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,83 @@
+import gzip
+import os
+import unittest
+
+from compress import precompress, remove_compressed
+from fixtures import FileTreeMixin
+
+
+class TestPrecompress(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.public = self.tmp.name
+        self.write("index.html", "<p>hello</p>" * 200)
+        self.write(os.path.join("blog", "post.html"), "<p>post</p>" * 200)
+        self.write("index.css", "body { color: red; }\n" * 50)
+        self.write("tiny.txt", "x")
+        self.write(os.path.join("images", "a.png"), "not text")
+
+    def path(self, rel_path):
+        return os.path.join(self.public, rel_path)
+
+    def write(self, rel_path, text):
+        super().write(self.path(rel_path), text)
+
+    def test_writes_gz_siblings(self):
+        result = precompress(self.public)
+        self.assertEqual(sorted(result.compressed), ["blog/post.html", "index.css", "index.html"])
+        self.assertEqual(result.incompressible, ["tiny.txt"])
+        self.assertFalse(os.path.exists(self.path("tiny.txt.gz")))
+        self.assertFalse(os.path.exists(self.path("images/a.png.gz")))
+        with gzip.open(self.path("index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 200)
+
+    def test_unchanged_files_are_skipped(self):
+        first = precompress(self.public)
+        second = precompress(self.public, first.state)
+        self.assertEqual(second.compressed, [])
+        self.assertEqual(len(second.skipped), 4)
+
+    def test_rewritten_with_same_content_is_skipped(self):
+        first = precompress(self.public)
+        self.write("index.html", "<p>hello</p>" * 200)
+        os.utime(self.path("index.html"), ns=(1, 1))
+        second = precompress(self.public, first.state)
+        self.assertEqual(second.compressed, [])
+        self.write("index.html", "<p>changed</p>" * 200)
+        third = precompress(self.public, second.state)
+        self.assertEqual(third.compressed, ["index.html"])
+
+    def test_level_change_recompresses(self):
+        first = precompress(self.public, level=9)
+        second = precompress(self.public, first.state, level=1)
+        self.assertEqual(len(second.compressed), 3)
+
+    def test_deleted_gz_is_rewritten(self):
+        first = precompress(self.public)
+        os.remove(self.path("index.css.gz"))
+        self.assertEqual(precompress(self.public, first.state).compressed, ["index.css"])
+
+    def test_removed_output_drops_its_gz(self):
+        first = precompress(self.public, jobs=1)
+        os.remove(self.path("index.html"))
+        second = precompress(self.public, first.state, jobs=1)
+        self.assertEqual(second.removed, ["index.html"])
+        self.assertFalse(os.path.exists(self.path("index.html.gz")))
+
+    def test_remove_compressed(self):
+        first = precompress(self.public, jobs=1)
+        removed = remove_compressed(self.public, first.state)
+        self.assertEqual(removed, first.compressed)
+        self.assertEqual([name for name in os.listdir(self.public) if name.endswith(".gz")], [])
+
+    def test_output_is_deterministic(self):
+        precompress(self.public)
+        with open(self.path("index.html.gz"), "rb") as f:
+            first = f.read()
+        precompress(self.public, level=9)
+        with open(self.path("index.html.gz"), "rb") as f:
+            self.assertEqual(f.read(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import unittest
+
+from copystatic import asset_map, fingerprinted_name, sync_files, write_asset_manifest
+from fixtures import FileTreeMixin
+from walk import load_ignore_rules
+
+
+class TestSyncFiles(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "docs")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png-a")
+        self.write(os.path.join(self.static, "images", "b.png"), "png-b")
+
+    def test_first_sync_copies_everything(self):
+        result = sync_files(self.static, self.public)
+        self.assertEqual(sorted(result.copied), ["images/a.png", "images/b.png", "index.css"])
+        self.assertEqual(self.read(os.path.join(self.public, "images", "a.png")), "png-a")
+
+    def test_second_sync_skips_unchanged(self):
+        first = sync_files(self.static, self.public)
+        result = sync_files(self.static, self.public, first.files)
+        self.assertEqual(result.copied, [])
+        self.assertEqual(len(result.skipped), 3)
+
+    def test_changed_file_is_copied(self):
+        first = sync_files(self.static, self.public)
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        result = sync_files(self.static, self.public, first.files)
+        self.assertEqual(result.copied, ["index.css"])
+        self.assertEqual(self.read(os.path.join(self.public, "index.css")), "body { color: red }")
+
+    def test_touched_file_skipped_with_hash(self):
+        first = sync_files(self.static, self.public)
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 10**9))
+        result = sync_files(self.static, self.public, first.files, use_hash=True)
+        self.assertEqual(result.copied, [])
+        result = sync_files(self.static, self.public, first.files)
+        self.assertEqual(result.copied, [])
+
+    def test_stale_outputs_removed(self):
+        first = sync_files(self.static, self.public)
+        os.remove(os.path.join(self.static, "images", "b.png"))
+        result = sync_files(self.static, self.public, first.files)
+        self.assertEqual(result.removed, ["images/b.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "b.png")))
+
+    def test_unrelated_outputs_kept(self):
+        self.write(os.path.join(self.public, "index.html"), "<p>page</p>")
+        sync_files(self.static, self.public, [])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_ignored_files_skipped_and_removed(self):
+        self.write(os.path.join(self.static, "images", "a.png:Zone.Identifier"), "[ZoneTransfer]")
+        self.write(os.path.join(self.static, "drafts", "new.css"), "p {}")
+        first = sync_files(self.static, self.public)
+        self.assertEqual(len(first.copied), 5)
+        result = sync_files(self.static, self.public, first.files, ignore=load_ignore_rules("missing", ["drafts/"]))
+        self.assertEqual(result.removed, ["drafts/new.css", "images/a.png:Zone.Identifier"])
+        self.assertEqual(result.files, ["images/a.png", "images/b.png", "index.css"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "drafts", "new.css")))
+
+
+class TestFingerprint(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "docs")
+        for rel_path, text in [("index.css", "body {}"), ("images/a.png", "png-a"), ("robots.txt", "ok")]:
+            self.write(os.path.join(self.static, rel_path), text)
+
+    def test_assets_copied_under_hashed_names(self):
+        result = sync_files(self.static, self.public, fingerprints={})
+        urls = asset_map(result.fingerprints)
+        self.assertEqual(sorted(urls), ["/images/a.png", "/index.css"])
+        self.assertRegex(urls["/index.css"], r"^/index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(sorted(result.copied), sorted([urls["/images/a.png"][1:], urls["/index.css"][1:], "robots.txt"]))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, urls["/index.css"][1:])))
+
+    def test_changed_asset_gets_new_name(self):
+        first = sync_files(self.static, self.public, fingerprints={})
+        second = sync_files(self.static, self.public, first.files, fingerprints=first.fingerprints)
+        self.assertEqual(second.copied, [])
+        self.assertEqual(second.fingerprints, first.fingerprints)
+
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        third = sync_files(self.static, self.public, second.files, fingerprints=second.fingerprints)
+        old_name = first.fingerprints["index.css"][2]
+        new_name = third.fingerprints["index.css"][2]
+        self.assertNotEqual(new_name, old_name)
+        self.assertEqual(third.copied, [new_name])
+        self.assertEqual(third.removed, [old_name])
+        self.assertEqual(third.renamed[new_name], "index.css")
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(fingerprinted_name(os.path.join("a", "b.min.js"), "0123456789abcdef"), os.path.join("a", "b.min.0123456789.js"))
+
+    def test_asset_manifest(self):
+        path = os.path.join(self.public, "asset-manifest.json")
+        write_asset_manifest(path, {"/index.css": "/index.0123456789.css"})
+        with open(path) as f:
+            self.assertEqual(json.load(f), {"/index.css": "/index.0123456789.css"})
+        write_asset_manifest(path, {})
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
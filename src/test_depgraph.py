@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from depgraph import DependencyGraph, collect_asset_urls
+from gencontent import generate_pages_recursive
+from htmlnode import markdown_to_html_node
+from manifest import BuildManifest
+
+
+class TestCollectAssetUrls(unittest.TestCase):
+    def test_images_and_file_links(self):
+        node = markdown_to_html_node(
+            "![a](/images/a.png) [pdf](/files/doc.pdf?v=1) [page](/blog/tom) "
+            "[home](/) [ext](https://example.com/x.png) ![b](//cdn.example.com/b.png)"
+        )
+        self.assertEqual(collect_asset_urls(node), ["/files/doc.pdf", "/images/a.png"])
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = DependencyGraph({
+            "docs/index.html": {
+                "source": "content/index.md", "template": "./template.html", "basepath": "/",
+                "assets": {"/images/a.png": [1, 2]},
+            },
+            "docs/blog/post.html": {
+                "source": "content/blog/post.md", "template": "./template.html", "basepath": "/",
+                "assets": {"/images/a.png": [1, 2], "/images/b.png": None},
+            },
+            "docs/contact.html": {
+                "source": "content/contact.md", "template": "./template.html", "basepath": "/", "assets": {},
+            },
+        })
+
+    def test_template_change(self):
+        self.assertEqual(len(self.graph.invalidated_by(("template", "template.html"))), 3)
+
+    def test_asset_change(self):
+        self.assertEqual(
+            self.graph.invalidated_by(("asset", "/images/a.png")),
+            ["docs/blog/post.html", "docs/index.html"],
+        )
+        self.assertEqual(self.graph.invalidated_by(("asset", "/images/b.png")), ["docs/blog/post.html"])
+
+    def test_source_change(self):
+        self.assertEqual(self.graph.invalidated_by(("source", "./content/contact.md")), ["docs/contact.html"])
+
+    def test_dependencies(self):
+        self.assertIn(("asset", "/images/b.png"), self.graph.dependencies("docs/blog/post.html"))
+
+
+class TestExplain(unittest.TestCase):
+    def test_renamed_image_rebuilds_only_its_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            public = os.path.join(tmp, "docs")
+            template = os.path.join(tmp, "template.html")
+            os.makedirs(content)
+            os.makedirs(os.path.join(public, "images"))
+            with open(os.path.join(public, "images", "a.png"), "wb") as f:
+                f.write(b"png")
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\n![a](/images/a.png)")
+            with open(os.path.join(content, "other.md"), "w") as f:
+                f.write("# Other\n\ntext")
+            with open(template, "w") as f:
+                f.write("{{ Content }}")
+
+            manifest_path = os.path.join(tmp, "manifest.json")
+            manifest = BuildManifest.load(manifest_path, public)
+            generate_pages_recursive(content, template, public, "/", manifest)
+            manifest.save()
+
+            os.rename(os.path.join(public, "images", "a.png"), os.path.join(public, "images", "renamed.png"))
+            manifest = BuildManifest.load(manifest_path, public)
+            entry = manifest.page_entry(os.path.join(content, "index.md"), template, "/")
+            self.assertEqual(
+                manifest.stale_reasons(os.path.join(public, "index.html"), entry),
+                ["asset /images/a.png removed"],
+            )
+            self.assertEqual(generate_pages_recursive(content, template, public, "/", manifest), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gencontent
+from feeds import PageMetadata, page_date, page_summary, remove_aggregates, write_aggregates
+from fixtures import FileTreeMixin
+from gencontent import generate_pages_recursive
+from htmlnode import markdown_to_html_node
+from manifest import BuildManifest
+from urls import UrlRewriter
+
+
+class TestPageMetadata(unittest.TestCase):
+    def test_summary_skips_link_and_image_paragraphs(self):
+        node = markdown_to_html_node(
+            "# Tom\n\n[< Back Home](/)\n\n![Tom](/images/tom.png)\n\n> a quote\n\nIn the **vast** weave of [lore](/x)."
+        )
+        self.assertEqual(page_summary(node), "In the vast weave of lore.")
+        self.assertIsNone(page_summary(markdown_to_html_node("# Title\n\n- just\n- a list")))
+
+    def test_summary_is_cut_at_a_word(self):
+        summary = page_summary(markdown_to_html_node("word " * 100))
+        self.assertLessEqual(len(summary), 201)
+        self.assertTrue(summary.endswith("word…"))
+
+    def test_date(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "2024-05-01-post.md")
+            open(path, "w").close()
+            self.assertEqual(page_date(path), "2024-05-01T00:00:00Z")
+            path = os.path.join(tmp, "post.md")
+            open(path, "w").close()
+            os.utime(path, (0, 86400))
+            self.assertEqual(page_date(path), "1970-01-02T00:00:00Z")
+
+
+class TestAggregates(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "docs")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.metadata_path = os.path.join(self.tmp.name, "pages.json")
+        self.manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        self.urls = UrlRewriter("/", "https://example.com")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome.")
+        for day in range(1, 6):
+            self.write(
+                os.path.join(self.content, "blog", f"2024-05-0{day}-post", "index.md"),
+                f"# Post {day}\n\n[< Back Home](/)\n\nPost number {day} & more.",
+            )
+
+    def read_output(self, rel_path):
+        return self.read(os.path.join(self.public, rel_path))
+
+    def build(self, per_page=2, **kwargs):
+        manifest = BuildManifest.load(self.manifest_path, self.public)
+        metadata = PageMetadata(self.public, self.metadata_path)
+        count = generate_pages_recursive(
+            self.content, self.template, self.public, self.urls, manifest, metadata=metadata, **kwargs
+        )
+        result = write_aggregates(metadata, self.template, self.urls, per_page)
+        manifest.save()
+        metadata.save()
+        return count, result
+
+    def test_index_feed_and_sitemap(self):
+        count, result = self.build()
+        self.assertEqual(count, 6)
+        self.assertEqual(
+            sorted(result.written),
+            ["blog/atom.xml", "blog/index.html", "blog/page/2/index.html", "blog/page/3/index.html", "sitemap.xml"],
+        )
+        index = self.read_output("blog/index.html")
+        self.assertLess(index.index("Post 5"), index.index("Post 4"))
+        self.assertNotIn("Post 3", index)
+        self.assertIn("Post number 5 &amp; more.", index)
+        self.assertIn('href="https://example.com/blog/page/2/">Older', index)
+        self.assertIn("Post 1", self.read_output("blog/page/3/index.html"))
+
+        feed = self.read_output("blog/atom.xml")
+        self.assertIn("<updated>2024-05-05T00:00:00Z</updated>", feed)
+        self.assertIn('<link href="https://example.com/blog/2024-05-01-post/"/>', feed)
+        sitemap = self.read_output("sitemap.xml")
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/blog/page/3/</loc><lastmod>2024-05-01</lastmod>", sitemap)
+
+    def test_one_changed_post_reads_no_other_source(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "2024-05-03-post", "index.md"), "# Renamed\n\nNew words.")
+        with mock.patch.object(gencontent, "read_source", wraps=gencontent.read_source) as read_source:
+            count, result = self.build()
+        self.assertEqual(count, 1)
+        self.assertEqual(read_source.call_count, 1)
+        self.assertEqual(sorted(result.written), ["blog/atom.xml", "blog/page/2/index.html"])
+        self.assertIn("Renamed", self.read_output("blog/page/2/index.html"))
+
+        # nothing changed: nothing rebuilt or rewritten
+        self.assertEqual(self.build()[0], 0)
+        self.assertEqual(self.build()[1].written, [])
+
+    def test_removed_post_and_fewer_pages(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "2024-05-05-post", "index.md"))
+        manifest = BuildManifest.load(self.manifest_path, self.public)
+        metadata = PageMetadata(self.public, self.metadata_path)
+        generate_pages_recursive(self.content, self.template, self.public, self.urls, manifest, metadata=metadata)
+        for dest_path in manifest.stale_outputs():
+            metadata.remove(dest_path)
+        result = write_aggregates(metadata, self.template, self.urls, per_page=2)
+        self.assertEqual(result.removed, ["blog/page/3/index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "page", "3")))
+        self.assertNotIn("Post 5", self.read_output("blog/atom.xml"))
+
+    def test_missing_metadata_rebuilds_pages(self):
+        self.build()
+        os.remove(self.metadata_path)
+        self.assertEqual(self.build()[0], 6)
+
+    def test_streamed_pages_get_the_same_summary(self):
+        self.build(stream_over=0)
+        streamed = self.read_output("blog/atom.xml")
+        os.remove(self.metadata_path)
+        self.build()
+        self.assertEqual(self.read_output("blog/atom.xml"), streamed)
+
+    def test_content_page_wins_over_generated_index(self):
+        self.write(os.path.join(self.content, "blog", "index.md"), "# My blog\n\nHand made.")
+        _, result = self.build()
+        self.assertEqual(result.conflicts, ["blog/index.html"])
+        self.assertIn("Hand made.", self.read_output("blog/index.html"))
+
+    def test_remove_aggregates(self):
+        self.build()
+        self.assertEqual(len(remove_aggregates(self.public, self.metadata_path)), 5)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "sitemap.xml")))
+        self.assertFalse(os.path.exists(self.metadata_path))
+        self.assertEqual(remove_aggregates(self.public, self.metadata_path), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import os
+import tracemalloc
 import unittest
 
-from gencontent import extract_title
+from fixtures import FileTreeMixin
+from gencontent import PageBuildError, extract_title, generate_page, generate_pages_recursive
+from manifest import BuildManifest
+from pipeline import PipelineConfig
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +51,134 @@ no title
             pass
 
 
+class TestParallelBuild(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        for i in range(12):
+            self.write(
+                os.path.join(self.content, f"section{i % 3}", f"page{i}.md"),
+                f"# Page {i}\n\nSome **bold** text and a [link](/page{i}).\n\n- one\n- two",
+            )
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "/site/")
+        generate_pages_recursive(self.content, self.template, parallel, "/site/", jobs=4)
+        self.assertEqual(len(self.read_tree(serial)), 12)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+
+    def test_failures_are_reported_per_page(self):
+        broken = os.path.join(self.content, "section1", "broken.md")
+        self.write(broken, "# Broken\n\nan `unclosed code span")
+        out = os.path.join(self.tmp.name, "out")
+        with self.assertRaises(PageBuildError) as context:
+            generate_pages_recursive(self.content, self.template, out, "/", jobs=4)
+        self.assertEqual([path for path, _ in context.exception.failures], [broken])
+        # the other pages still get built
+        self.assertEqual(len(self.read_tree(out)), 12)
+
+    def test_failed_render_keeps_last_output(self):
+        source = os.path.join(self.content, "section0", "page0.md")
+        out = os.path.join(self.tmp.name, "out")
+        dest = os.path.join(out, "section0", "page0.html")
+        generate_pages_recursive(self.content, self.template, out, "/")
+        before = self.read_tree(out)
+        # a lone ">" is a blockquote with no children, which fails halfway through rendering
+        self.write(source, "# Page 0\n\nhello\n\n>")
+        for kwargs in ({}, {"stream_over": 0}):
+            with self.assertRaises(ValueError):
+                generate_page(source, self.template, dest, "/", **kwargs)
+            self.assertEqual(self.read_tree(out), before)
+
+
+class TestStreamedBuild(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def build(self, markdown, stream_over, newline=None):
+        source = os.path.join(self.tmp.name, "page.md")
+        self.write(source, markdown, newline)
+        dest = os.path.join(self.tmp.name, f"page{stream_over}.html")
+        result = generate_page(source, self.template, dest, "/site/", stream_over=stream_over)
+        return self.read(dest), result
+
+    def test_matches_in_memory_conversion(self):
+        markdown = (
+            "intro\n\n# The *Title*\n\n![a](/images/a.png) and [doc](/doc.pdf)\n\n"
+            "```\ncode\n\nwith blank line\n```\n\n> quote\n> more\n\n- a\n- b\n\n1. one\n2. two\n\n## sub"
+        )
+        self.assertEqual(self.build(markdown, 0), self.build(markdown, None))
+
+    def test_crlf_source_matches_in_memory_conversion(self):
+        markdown = "# Title\r\n\r\nsome *text*\r\n\r\n- a\r\n- b\r\n"
+        streamed = self.build(markdown, 0, newline="")
+        self.assertEqual(streamed, self.build(markdown, None, newline=""))
+        self.assertIn("<title>Title</title>", streamed[0])
+
+    def test_missing_title(self):
+        with self.assertRaises(ValueError):
+            self.build("no title\n\ntext", 0)
+
+    def test_memory_follows_largest_block(self):
+        block = "Some **bold** and _italic_ text with a [link](/somewhere). " * 4
+        source = os.path.join(self.tmp.name, "big.md")
+        self.write(source, "# Big\n\n" + (block + "\n\n") * 2500)
+        self.assertGreater(os.path.getsize(source), 500_000)
+        tracemalloc.start()
+        try:
+            generate_page(source, self.template, os.path.join(self.tmp.name, "big.html"), "/", stream_over=0)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 200_000)
+
+
+class TestBoundedMemory(FileTreeMixin, unittest.TestCase):
+    # Each page's source, tree and html are released before later pages pile up, so the
+    # working set on top of what the build keeps (page list, manifest) stays the same
+    # however many pages there are.
+    PAGE = "Some **bold** text with a [link](/x) and `code`.\n\n- one\n- two\n\n" * 40
+
+    def setUp(self):
+        super().setUp()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def measure(self, count, **options):
+        # (peak working set, bytes still held afterwards)
+        root = os.path.join(self.tmp.name, str(count))
+        content = os.path.join(root, "content")
+        for i in range(count):
+            self.write(os.path.join(content, f"section{i % 4}", f"page{i}.md"), f"# Page {i}\n\n" + self.PAGE)
+        public = os.path.join(root, "docs")
+        manifest = BuildManifest(os.path.join(root, "manifest.json"), public_dir=public)
+        tracemalloc.start()
+        try:
+            generate_pages_recursive(content, self.template, public, "/", manifest, **options)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak - current, current
+
+    def assert_flat(self, **options):
+        small_working, small_kept = self.measure(16, **options)
+        large_working, large_kept = self.measure(64, **options)
+        self.assertLess(large_working, small_working * 1.5)
+        # what is kept is the page list and manifest entries, far less than the pages themselves
+        self.assertLess((large_kept - small_kept) / 48, 1500)
+
+    def test_serial(self):
+        self.assert_flat()
+
+    def test_pipeline(self):
+        self.assert_flat(pipeline=PipelineConfig(4, 4, 2))
+
+
 if __name__ == "__main__":
     unittest.main()
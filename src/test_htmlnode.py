@@ -1,7 +1,10 @@
+import io
 import unittest
+
 from htmlnode import HTMLNode, LeafNode, ParentNode, text_node_to_html_node, split_nodes_delimiter, extract_markdown_images, extract_markdown_links, split_nodes_image, split_nodes_link, text_to_textnodes, markdown_to_blocks
 from textnode import TextNode, TextType
 from enum import Enum
+from urls import UrlRewriter
 
 class TestHTMLNode(unittest.TestCase):
     def test_props_to_html_no_props(self):
@@ -442,6 +445,51 @@ class TestHTMLNode(unittest.TestCase):
             ],
             new_nodes,
         )
+
+    def test_nodes_have_no_dict(self):
+        leaf = LeafNode("b", "bold")
+        parent = ParentNode("p", [leaf])
+        self.assertFalse(hasattr(leaf, "__dict__"))
+        self.assertFalse(hasattr(parent, "__dict__"))
+        self.assertIsNone(parent.value)
+        self.assertIn("tag=p", repr(parent))
+
+    def test_write_html_to_list_and_stream(self):
+        node = ParentNode("div", [LeafNode("b", "bold"), ParentNode("p", [LeafNode(None, "text")], {"class": "x"})])
+        buffer = []
+        node.write_html(buffer)
+        self.assertEqual("".join(buffer), '<div><b>bold</b><p class="x">text</p></div>')
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_write_html_deep_tree(self):
+        node = LeafNode(None, "leaf")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertEqual(len(html), 5000 * len("<span></span>") + len("leaf"))
+
+    def test_write_html_validates_nested_parents(self):
+        node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            node.write_html([])
+
+    def test_urls_rewritten_in_props(self):
+        urls = UrlRewriter("/site/")
+        node = ParentNode("p", [
+            LeafNode("a", "home", {"href": "/"}),
+            LeafNode("img", "", {"src": "/a.png", "alt": "/a.png"}),
+            LeafNode("a", "ext", {"href": "https://example.com/"}),
+            LeafNode(None, 'href="/raw"'),
+        ])
+        self.assertEqual(
+            node.to_html(urls),
+            '<p><a href="/site/">home</a><img src="/site/a.png" alt="/a.png">'
+            '<a href="https://example.com/">ext</a>href="/raw"</p>',
+        )
+        self.assertIn('href="/"', node.to_html())
     
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
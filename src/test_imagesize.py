@@ -0,0 +1,128 @@
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import imagesize
+from gencontent import generate_pages_recursive
+from htmlnode import markdown_to_html_node
+from imagesize import ImageSizes, add_image_sizes, probe_image
+
+
+def png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + chunk
+
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc2" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+def webp(chunk, payload):
+    body = b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+class TestProbeImage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def probe(self, data):
+        path = os.path.join(self.tmp.name, "image")
+        with open(path, "wb") as f:
+            f.write(data)
+        return probe_image(path)
+
+    def test_formats(self):
+        self.assertEqual(self.probe(png(640, 480)), (640, 480))
+        self.assertEqual(self.probe(b"GIF89a" + struct.pack("<HH", 32, 16) + b"\x00" * 8), (32, 16))
+        self.assertEqual(self.probe(jpeg(1920, 1080)), (1920, 1080))
+        lossy = b"\x00" * 3 + b"\x9d\x01\x2a" + struct.pack("<HH", 300, 200)
+        self.assertEqual(self.probe(webp(b"VP8 ", lossy)), (300, 200))
+        bits = (300 - 1) | (200 - 1) << 14
+        self.assertEqual(self.probe(webp(b"VP8L", b"\x2f" + struct.pack("<I", bits))), (300, 200))
+        extended = b"\x00" * 4 + (300 - 1).to_bytes(3, "little") + (200 - 1).to_bytes(3, "little")
+        self.assertEqual(self.probe(webp(b"VP8X", extended)), (300, 200))
+
+    def test_unknown_and_truncated(self):
+        self.assertIsNone(self.probe(b"not an image"))
+        self.assertIsNone(self.probe(b"\xff\xd8\xff\xe0\x00"))
+
+
+class TestImageSizes(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.tmp.name, "docs")
+        self.cache_path = os.path.join(self.tmp.name, "images.json")
+        os.makedirs(os.path.join(self.public, "images"))
+        with open(os.path.join(self.public, "images", "a.png"), "wb") as f:
+            f.write(png(640, 480))
+        imagesize._loaded.clear()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        imagesize._loaded.clear()
+
+    def test_adds_attributes_to_local_images(self):
+        node = markdown_to_html_node("![a](/images/a.png) ![b](/images/missing.png) ![c](https://example.com/c.png)")
+        add_image_sizes(node, ImageSizes(self.public))
+        images = node.children[0].children
+        self.assertEqual(
+            images[0].to_html(),
+            '<img src="/images/a.png" alt="a" width="640" height="480" loading="lazy" decoding="async">',
+        )
+        self.assertEqual(images[2].to_html(), '<img src="/images/missing.png" alt="b">')
+        self.assertEqual(images[4].to_html(), '<img src="https://example.com/c.png" alt="c">')
+
+    def test_sizes_cached_by_mtime(self):
+        images = ImageSizes(self.public, self.cache_path)
+        path = os.path.join(self.public, "images", "a.png")
+        self.assertEqual(images.size(path), (640, 480))
+        images.save()
+        imagesize._loaded.clear()
+
+        with mock.patch.object(imagesize, "probe_image", side_effect=AssertionError("probed")):
+            self.assertEqual(ImageSizes(self.public, self.cache_path).size(path), (640, 480))
+        with open(path, "wb") as f:
+            f.write(png(320, 240))
+        os.utime(path, ns=(1, 1))
+        self.assertEqual(ImageSizes(self.public, self.cache_path).size(path), (320, 240))
+
+    def test_returns_only_this_nodes_probes(self):
+        with open(os.path.join(self.public, "images", "b.png"), "wb") as f:
+            f.write(png(10, 20))
+        images = ImageSizes(self.public)
+        first = add_image_sizes(markdown_to_html_node("![a](/images/a.png)"), images)
+        self.assertEqual(list(first), [os.path.join(self.public, "images", "a.png")])
+        second = add_image_sizes(markdown_to_html_node("![a](/images/a.png) ![b](/images/b.png)"), images)
+        self.assertEqual(list(second), [os.path.join(self.public, "images", "b.png")])
+        self.assertEqual(len(images.probed), 2)
+
+    def test_parallel_build_reports_probes(self):
+        content = os.path.join(self.tmp.name, "content")
+        os.makedirs(content)
+        for i in range(2):
+            with open(os.path.join(content, f"page{i}.md"), "w") as f:
+                f.write(f"# Page {i}\n\n![a](/images/a.png)")
+        template = os.path.join(self.tmp.name, "template.html")
+        with open(template, "w") as f:
+            f.write("{{ Content }}")
+        images = ImageSizes(self.public, self.cache_path)
+        generate_pages_recursive(content, template, self.public, "/", jobs=2, images=images)
+        with open(os.path.join(self.public, "page0.html")) as f:
+            self.assertIn('width="640" height="480"', f.read())
+        self.assertEqual(list(images.probed), [os.path.join(self.public, "images", "a.png")])
+        images.save()
+        self.assertTrue(os.path.exists(self.cache_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
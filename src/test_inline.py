@@ -0,0 +1,69 @@
+import random
+import unittest
+
+from htmlnode import scan_inline, split_nodes_link, text_to_textnodes, text_to_textnodes_multipass
+from textnode import TextNode, TextType
+
+
+def parse_or_error(parse, text):
+    try:
+        return parse(text)
+    except Exception:
+        return "error"
+
+
+class TestScanInline(unittest.TestCase):
+    def test_all_span_types(self):
+        nodes = scan_inline("**b** _i_ `c` ![alt](/a.png) [link](/b)")
+        self.assertListEqual(
+            [
+                TextNode("", TextType.NORMAL_TEXT),
+                TextNode("b", TextType.BOLD_TEXT),
+                TextNode(" ", TextType.NORMAL_TEXT),
+                TextNode("i", TextType.ITALIC_TEXT),
+                TextNode(" ", TextType.NORMAL_TEXT),
+                TextNode("c", TextType.CODE_TEXT),
+                TextNode(" ", TextType.NORMAL_TEXT),
+                TextNode("alt", TextType.IMAGES, "/a.png"),
+                TextNode(" ", TextType.NORMAL_TEXT),
+                TextNode("link", TextType.LINKS, "/b"),
+            ],
+            nodes,
+        )
+
+    def test_images_survive_link_pass(self):
+        nodes = text_to_textnodes("see ![alt](/a.png)")
+        self.assertEqual(nodes[1], TextNode("alt", TextType.IMAGES, "/a.png"))
+        nodes = split_nodes_link([TextNode("alt", TextType.IMAGES, "/a.png")])
+        self.assertEqual(nodes, [TextNode("alt", TextType.IMAGES, "/a.png")])
+
+    def test_nested_spans_stay_literal(self):
+        self.assertEqual(scan_inline("**a _b_ `c`**")[1], TextNode("a _b_ `c`", TextType.BOLD_TEXT))
+        self.assertEqual(scan_inline("_a `b`_")[1], TextNode("a `b`", TextType.ITALIC_TEXT))
+
+    def test_unmatched_delimiters(self):
+        for text in ["**open", "_open", "`open", "_a **b** c_", "`a_b`", "**[x](y)**"]:
+            with self.assertRaises(Exception):
+                scan_inline(text)
+
+    def test_empty(self):
+        self.assertEqual(scan_inline(""), [])
+
+    def test_matches_multipass(self):
+        # differential test against the original split chain on random inline markdown
+        pieces = [
+            "word", "two words", " ", "**", "_", "`", "*", "!", "[", "]", "(", ")",
+            "[x](/y)", "![i](/u.png)", "![a](b", "[q]", "snake_case",
+        ]
+        rng = random.Random(5)
+        for _ in range(5000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(
+                parse_or_error(scan_inline, text),
+                parse_or_error(text_to_textnodes_multipass, text),
+                f"mismatch for {text!r}",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
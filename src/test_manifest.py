@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from fixtures import FileTreeMixin
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+from urls import UrlRewriter
+
+
+class TestIncrementalBuild(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest_path = os.path.join(root, ".cache", "manifest.json")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nA [link](/home)")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def build(self, basepath="/"):
+        manifest = BuildManifest.load(self.manifest_path)
+        generated = generate_pages_recursive(self.content, self.template, self.public, basepath, manifest)
+        manifest.save()
+        return generated
+
+    def test_second_build_skips_everything(self):
+        self.assertEqual(self.build(), 2)
+        self.assertEqual(self.build(), 0)
+
+    def test_changed_source_rebuilds_only_that_page(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome back")
+        self.assertEqual(self.build(), 1)
+        self.assertIn("Welcome back", self.read(os.path.join(self.public, "index.html")))
+
+    def test_changed_template_rebuilds_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build(), 2)
+
+    def test_changed_basepath_rebuilds_everything(self):
+        self.build()
+        self.assertEqual(self.build("/site/"), 2)
+
+    def test_changed_site_url_rebuilds_everything(self):
+        self.build()
+        self.assertEqual(self.build(UrlRewriter("/", "https://example.com")), 2)
+        self.assertEqual(self.build(UrlRewriter("/", "https://example.com")), 0)
+        self.assertIn('href="https://example.com/home"', self.read(os.path.join(self.public, "blog", "post.html")))
+
+    def test_fingerprinted_template_asset_rebuilds_everything(self):
+        self.write(self.template, '<link href="/index.css">{{ Content }}')
+
+        def build(fingerprint):
+            manifest = BuildManifest.load(self.manifest_path, self.public)
+            manifest.asset_map = {"/index.css": fingerprint}
+            urls = UrlRewriter("/", fingerprints=manifest.asset_map)
+            generated = generate_pages_recursive(self.content, self.template, self.public, urls, manifest)
+            manifest.save()
+            return generated
+
+        self.assertEqual(build("/index.0000000000.css"), 2)
+        self.assertEqual(build("/index.0000000000.css"), 0)
+        self.assertEqual(build("/index.1111111111.css"), 2)
+        self.assertIn('href="/index.1111111111.css"', self.read(os.path.join(self.public, "index.html")))
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.remove(os.path.join(self.public, "blog", "post.html"))
+        self.assertEqual(self.build(), 1)
+
+    def test_stale_outputs(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        manifest = BuildManifest.load(self.manifest_path)
+        generate_pages_recursive(self.content, self.template, self.public, "/", manifest)
+        self.assertEqual(manifest.stale_outputs(), [os.path.join(self.public, "blog", "post.html")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -70,6 +70,11 @@ class TestMarkdownToHTML(unittest.TestCase):
             "<div><blockquote>This is a blockquote with multiple lines</blockquote></div>"
         )
 
+    def test_codeblock_with_blank_lines(self):
+        md = "```\nfirst\n\nsecond\n```"
+        node = markdown_to_html_node(md)
+        self.assertEqual(node.to_html(), "<div><pre><code>first\n\nsecond\n</code></pre></div>")
+
 
                                   
 if __name__ == "__main__":
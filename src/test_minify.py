@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from minify import MinifyStream, minify_tag
+
+
+def minify(html, chunk_size=None):
+    out = []
+    stream = MinifyStream(out)
+    if chunk_size is None:
+        stream.write(html)
+    else:
+        for i in range(0, len(html), chunk_size):
+            stream.write(html[i:i + chunk_size])
+    stream.close()
+    return "".join(out)
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>  A   page </title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <p>Some   <b>bold</b> <i>and italic</i>
+       text, a < b.</p>
+    <pre><code>keep
+    this   as is</code></pre>
+    <p>inline <code>x  =  1</code> code</p>
+    <img src="/a.png" alt="two words">
+  </body>
+</html>
+"""
+
+
+class TestMinify(unittest.TestCase):
+    def test_page(self):
+        self.assertEqual(
+            minify(PAGE),
+            "<!DOCTYPE html><html><head><title>A page</title>"
+            '<link href=/index.css rel="stylesheet"/></head><body>'
+            "<p>Some <b>bold</b> <i>and italic</i> text, a < b.</p>"
+            "<pre><code>keep\n    this   as is</code></pre>"
+            "<p>inline <code>x  =  1</code> code</p>"
+            '<img src=/a.png alt="two words"></body></html>',
+        )
+
+    def test_chunking_does_not_matter(self):
+        expected = minify(PAGE)
+        for chunk_size in [1, 2, 3, 7, 64]:
+            self.assertEqual(minify(PAGE, chunk_size), expected)
+
+    def test_minify_tag(self):
+        self.assertEqual(minify_tag('<a href="/x" class=\'a b\'>'), "<a href=/x class='a b'>")
+        self.assertEqual(minify_tag('<a href="/blog/">'), '<a href="/blog/">')
+        self.assertEqual(minify_tag('<img src="/a.png"/>'), '<img src="/a.png"/>')
+        self.assertEqual(minify_tag('<input disabled  value="">'), '<input disabled value="">')
+        self.assertEqual(minify_tag("</p>"), "</p>")
+
+    def test_comments_and_unfinished_tags_pass_through(self):
+        self.assertEqual(minify("<p>a</p>  <!--  keep  -->  <p>b</p>"), "<p>a</p><!--  keep  --><p>b</p>")
+        self.assertEqual(minify("<p>a <"), "<p>a <")
+
+    def test_comments_and_void_tags_keep_the_space_between_words(self):
+        self.assertEqual(minify("<p>one <!-- note --> two</p>"), "<p>one<!-- note --> two</p>")
+        self.assertEqual(minify("<p>one<!-- note -->two</p>"), "<p>one<!-- note -->two</p>")
+        self.assertEqual(minify("x <link rel=a> y <meta charset=utf-8> z"), "x <link rel=a> y <meta charset=utf-8> z")
+
+    def test_byte_counts(self):
+        out = []
+        stream = MinifyStream(out)
+        stream.write("<p>  a  </p>")
+        stream.close()
+        self.assertEqual((stream.bytes_in, stream.bytes_out), (12, 8))
+
+
+class TestMinifiedBuild(unittest.TestCase):
+    def test_build_reports_savings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nSome   text\n\n```\na   b\n```")
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+            for jobs in [1, 2]:
+                public = os.path.join(tmp, f"docs{jobs}")
+                generate_pages_recursive(content, template, public, "/", jobs=jobs, minify=True)
+                with open(os.path.join(public, "index.html")) as f:
+                    self.assertEqual(
+                        f.read(),
+                        "<html><body><div><h1>Home</h1><p>Some text</p><pre><code>a   b\n</code></pre></div></body></html>",
+                    )
+
+
+if __name__ == "__main__":
+    unittest.main()
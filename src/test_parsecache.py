@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gencontent
+import parsecache
+from fixtures import FileTreeMixin
+from gencontent import generate_pages_recursive
+from htmlnode import markdown_to_html_node
+from parsecache import ParseCache, decode_node, encode_node
+
+
+MARKDOWN = "# Title\n\nSome **bold** and [a link](/x.pdf)\n\n![img](/a.png)\n\n- one\n- two\n\n```\ncode\n```"
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ParseCache(os.path.join(self.tmp.name, "parsed"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        node = markdown_to_html_node(MARKDOWN)
+        self.assertEqual(decode_node(encode_node(node)).to_html(), node.to_html())
+
+    def test_get_and_put(self):
+        self.assertIsNone(self.cache.get(MARKDOWN))
+        node = markdown_to_html_node(MARKDOWN)
+        self.cache.put(MARKDOWN, node, "Title", ["/a.png"])
+        cached_node, title, assets = self.cache.get(MARKDOWN)
+        self.assertEqual(cached_node.to_html(), node.to_html())
+        self.assertEqual((title, assets), ("Title", ["/a.png"]))
+        self.assertIsNone(self.cache.get(MARKDOWN + " "))
+
+    def test_parser_version_is_part_of_the_key(self):
+        self.cache.put(MARKDOWN, markdown_to_html_node(MARKDOWN), "Title", [])
+        with mock.patch.object(parsecache, "PARSER_VERSION", parsecache.PARSER_VERSION + 1):
+            self.assertIsNone(self.cache.get(MARKDOWN))
+
+    def test_corrupt_entry_is_a_miss(self):
+        self.cache.put(MARKDOWN, markdown_to_html_node(MARKDOWN), "Title", [])
+        with open(self.cache.entry_path(self.cache.key(MARKDOWN)), "wb") as f:
+            f.write(b"garbage")
+        self.assertIsNone(self.cache.get(MARKDOWN))
+
+    def test_prune_evicts_least_recently_used(self):
+        sources = [f"# Page {i}\n\n" + "text " * 200 for i in range(3)]
+        for i, source in enumerate(sources):
+            self.cache.put(source, markdown_to_html_node(source), f"Page {i}", [])
+            path = self.cache.entry_path(self.cache.key(source))
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        # reading the oldest entry makes it the most recently used
+        self.cache.get(sources[0])
+        sizes = sorted(size for _, size, _ in self.cache.entries())
+        self.cache.max_bytes = sizes[0] + sizes[1]
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(sources[1]))
+        self.assertIsNotNone(self.cache.get(sources[0]))
+        self.assertIsNotNone(self.cache.get(sources[2]))
+
+    def test_clear(self):
+        self.cache.put(MARKDOWN, markdown_to_html_node(MARKDOWN), "Title", [])
+        self.cache.clear()
+        self.assertEqual(self.cache.entries(), [])
+
+
+class TestCachedBuild(FileTreeMixin, unittest.TestCase):
+    def test_template_change_skips_parsing(self):
+        tmp = self.tmp.name
+        content = os.path.join(tmp, "content")
+        for i in range(3):
+            self.write(os.path.join(content, f"page{i}.md"), MARKDOWN.replace("Title", f"Page {i}"))
+        template = os.path.join(tmp, "template.html")
+        self.write(template, "<h1>{{ Title }}</h1>{{ Content }}")
+        cache = ParseCache(os.path.join(tmp, "parsed"))
+        generate_pages_recursive(content, template, os.path.join(tmp, "plain"), "/blog/")
+        generate_pages_recursive(content, template, os.path.join(tmp, "first"), "/blog/", cache=cache)
+        self.assertEqual(len(cache.entries()), 3)
+
+        with mock.patch.object(gencontent, "markdown_to_html_node", side_effect=AssertionError("parsed")):
+            generate_pages_recursive(content, template, os.path.join(tmp, "second"), "/blog/", cache=cache)
+        self.assertEqual(self.read_tree(os.path.join(tmp, "second")), self.read_tree(os.path.join(tmp, "plain")))
+
+
+if __name__ == "__main__":
+    unittest.main()
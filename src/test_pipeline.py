@@ -0,0 +1,72 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from fixtures import FileTreeMixin
+from gencontent import PageBuildError, generate_pages_recursive
+from manifest import BuildManifest
+from pipeline import PipelineConfig
+from profiler import Profiler
+
+
+class TestPipeline(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        for i in range(20):
+            self.write(
+                os.path.join(self.content, f"dir{i % 4}", f"page{i}.md"),
+                f"# Page {i}\n\n**bold** and ![img](/images/{i}.png)\n\n- a\n- b",
+            )
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def build(self, name, **kwargs):
+        out = os.path.join(self.tmp.name, name)
+        generate_pages_recursive(self.content, self.template, out, "/site/", **kwargs)
+        return self.read_tree(out)
+
+    def test_matches_serial_build(self):
+        serial = self.build("serial")
+        self.assertEqual(len(serial), 20)
+        self.assertEqual(self.build("async", pipeline=PipelineConfig()), serial)
+        self.assertEqual(self.build("async_jobs", jobs=2, pipeline=PipelineConfig(2, 2, 2)), serial)
+
+    def test_tight_limits(self):
+        serial = self.build("serial")
+        self.assertEqual(self.build("tight", pipeline=PipelineConfig(1, 1, 1)), serial)
+
+    def test_records_manifest_and_profile(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        profiler = Profiler()
+        self.build("out", manifest=manifest, profiler=profiler, pipeline=PipelineConfig())
+        self.assertEqual(len(manifest.pages), 20)
+        self.assertEqual(profiler.totals()["write"]["count"], 20)
+        self.assertEqual(profiler.totals()["read"]["count"], 20)
+
+    def test_staleness_checks_stay_off_the_event_loop(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        threads = set()
+        page_entry = manifest.page_entry
+
+        def recording_page_entry(*args):
+            threads.add(threading.current_thread())
+            return page_entry(*args)
+
+        with mock.patch.object(manifest, "page_entry", side_effect=recording_page_entry):
+            self.build("out", manifest=manifest, pipeline=PipelineConfig())
+        self.assertEqual(len(manifest.pages), 20)
+        self.assertTrue(threads)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_failures(self):
+        broken = os.path.join(self.content, "broken.md")
+        self.write(broken, "no title here")
+        with self.assertRaises(PageBuildError) as context:
+            self.build("out", pipeline=PipelineConfig())
+        self.assertEqual([path for path, _ in context.exception.failures], [broken])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from gencontent import generate_pages_recursive
+from profiler import NULL_PROFILER, Profiler, TimedStream, format_peak_rss, peak_rss
+
+
+class TestProfiler(unittest.TestCase):
+    def test_phase_records_time_and_bytes(self):
+        profiler = Profiler()
+        with profiler.phase("read", "a.md") as phase:
+            phase.add_bytes(10)
+        with profiler.phase("read", "b.md") as phase:
+            phase.add_bytes(5)
+        totals = profiler.totals()
+        self.assertEqual(totals["read"]["bytes"], 15)
+        self.assertEqual(totals["read"]["count"], 2)
+        self.assertEqual(sorted(profiler.report()["pages"]), ["a.md", "b.md"])
+
+    def test_trace_events(self):
+        profiler = Profiler()
+        with profiler.phase("parse", "a.md"):
+            pass
+        event = profiler.trace_events()["traceEvents"][0]
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["name"], "parse")
+        self.assertEqual(event["args"]["page"], "a.md")
+        self.assertGreaterEqual(event["ts"], 0)
+
+    def test_timed_stream(self):
+        profiler = Profiler()
+        out = io.StringIO()
+        stream = TimedStream(out, profiler, "write", "a.md")
+        stream.write("abc")
+        stream.write("de")
+        stream.finish()
+        self.assertEqual(out.getvalue(), "abcde")
+        self.assertEqual(profiler.totals()["write"]["bytes"], 5)
+
+    def test_null_profiler_records_nothing(self):
+        with NULL_PROFILER.phase("read") as phase:
+            phase.add_bytes(10)
+        self.assertEqual(len(NULL_PROFILER.events), 0)
+
+    def test_build_phases(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            content = os.path.join(tmp, "content")
+            os.makedirs(content)
+            for i in range(3):
+                with open(os.path.join(content, f"page{i}.md"), "w") as f:
+                    f.write(f"# Page {i}\n\ntext")
+            template = os.path.join(tmp, "template.html")
+            with open(template, "w") as f:
+                f.write("{{ Title }}{{ Content }}")
+            for jobs in [1, 2]:
+                profiler = Profiler()
+                generate_pages_recursive(content, template, os.path.join(tmp, f"out{jobs}"), "/", jobs=jobs, profiler=profiler)
+                pages = profiler.report()["pages"]
+                self.assertEqual(len(pages), 3)
+                for phases in pages.values():
+                    self.assertEqual(sorted(phases), ["parse", "read", "render", "template", "write"])
+
+
+    @unittest.skipIf(peak_rss() is None, "no getrusage on this platform")
+    def test_peak_rss(self):
+        self_rss, worker_rss = peak_rss()
+        # a Python process with these modules loaded is well over a megabyte
+        self.assertGreater(self_rss, 1 << 20)
+        self.assertGreaterEqual(worker_rss, 0)
+        self.assertGreaterEqual(Profiler().report()["peak_rss_bytes"], self_rss)
+        self.assertTrue(format_peak_rss().startswith("Peak memory: "))
+
+    @unittest.skipIf(peak_rss() is None, "no getrusage on this platform")
+    def test_worker_rss_only_for_builds_with_workers(self):
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        self.assertNotIn("worker", format_peak_rss())
+        self.assertIn("largest worker", format_peak_rss(workers=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
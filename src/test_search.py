@@ -0,0 +1,177 @@
+import json
+import os
+import tempfile
+import unittest
+
+from bench_search import run
+from fixtures import FileTreeMixin
+from gencontent import generate_pages_recursive
+from htmlnode import markdown_to_html_node
+from manifest import BuildManifest
+from pipeline import PipelineConfig
+from search import SEARCH_DIR_NAME, TITLE_WEIGHT, SearchIndex, page_terms, page_url, remove_search_index, tokenize
+
+
+class TestTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Hello, World! a_b x 42 Café"), ["hello", "world", "42", "café"])
+
+    def test_page_terms(self):
+        node = markdown_to_html_node(
+            "# Cats\n\nCats **purr** and cats nap.\n\n```\nsecret_code()\n```\n\n![a sleepy cat](cat.png)"
+        )
+        terms = page_terms(node, "Cats")
+        self.assertEqual(terms["cats"], 3 + TITLE_WEIGHT)
+        self.assertEqual(terms["purr"], 1)
+        self.assertEqual(terms["sleepy"], 1)
+        self.assertNotIn("secret", terms)
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html"), "")
+        self.assertEqual(page_url(os.path.join("blog", "tom", "index.html")), "blog/tom/")
+        self.assertEqual(page_url("about.html"), "about.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.tmp.name, "docs")
+        self.state = os.path.join(self.tmp.name, "search.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index(self):
+        return SearchIndex(self.public, self.state, "/site/")
+
+    def page(self, name):
+        return os.path.join(self.public, name, "index.html")
+
+    def read(self, name):
+        with open(os.path.join(self.public, SEARCH_DIR_NAME, name), "r") as f:
+            return json.load(f)
+
+    def lookup(self, term):
+        meta = self.read("index.json")
+        shard = self.read(os.path.join("terms", term[:2] + ".json"))
+        postings = shard.get(term, [])
+        return {meta["docs"][str(postings[i])][0]: postings[i + 1] for i in range(0, len(postings), 2)}
+
+    def build_three(self):
+        index = self.index()
+        index.add(self.page("apple"), "Apple", {"apple": 5, "fruit": 2})
+        index.add(self.page("banana"), "Banana", {"banana": 5, "fruit": 1})
+        index.add(self.page("cherry"), "Cherry", {"cherry": 5, "tree": 1})
+        self.assertEqual(sorted(index.save()), ["ap", "ba", "ch", "fr", "tr"])
+        return index
+
+    def test_build(self):
+        self.build_three()
+        self.assertEqual(self.lookup("fruit"), {"apple/": 2, "banana/": 1})
+        meta = self.read("index.json")
+        self.assertEqual(meta["base"], "/site/")
+        self.assertEqual(meta["shards"], ["ap", "ba", "ch", "fr", "tr"])
+        self.assertTrue(os.path.exists(os.path.join(self.public, SEARCH_DIR_NAME, "search.js")))
+
+    def test_only_affected_shards_are_rewritten(self):
+        self.build_three()
+        index = self.index()
+        self.assertFalse(index.fresh)
+        index.add(self.page("banana"), "Banana", {"banana": 5, "yellow": 1})
+        self.assertEqual(sorted(index.save()), ["ba", "fr", "ye"])
+        self.assertEqual(self.lookup("fruit"), {"apple/": 2})
+        self.assertEqual(self.lookup("yellow"), {"banana/": 1})
+
+        # nothing changed: nothing written
+        self.assertEqual(self.index().save(), [])
+
+    def test_remove(self):
+        self.build_three()
+        index = self.index()
+        index.remove(self.page("cherry"))
+        self.assertTrue(index.pending)
+        self.assertEqual(sorted(index.save()), [])
+        self.assertFalse(os.path.exists(os.path.join(self.public, SEARCH_DIR_NAME, "terms", "ch.json")))
+        meta = self.read("index.json")
+        self.assertEqual(meta["shards"], ["ap", "ba", "fr"])
+        self.assertEqual(sorted(url for url, _ in meta["docs"].values()), ["apple/", "banana/"])
+
+    def test_starts_over_without_its_files(self):
+        token = self.build_three().token
+        os.remove(os.path.join(self.public, SEARCH_DIR_NAME, "index.json"))
+        index = self.index()
+        self.assertTrue(index.fresh)
+        self.assertNotEqual(index.token, token)
+
+    def test_remove_search_index(self):
+        self.build_three()
+        self.assertTrue(remove_search_index(self.public, self.state))
+        self.assertFalse(os.path.exists(os.path.join(self.public, SEARCH_DIR_NAME)))
+        self.assertFalse(remove_search_index(self.public, self.state))
+
+
+class TestSearchBuild(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.public = os.path.join(self.tmp.name, "docs")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome to the garden.")
+        self.write(os.path.join(self.content, "roses", "index.md"), "# Roses\n\nRoses need **sun** and water.")
+        self.write(
+            os.path.join(self.content, "big", "index.md"),
+            "# Big\n\n" + "".join(f"Paragraph {i} about tulips.\n\n" for i in range(200)),
+        )
+
+    def build(self, public, manifest=None, **kwargs):
+        search = SearchIndex(public, public + ".json", "/")
+        count = generate_pages_recursive(self.content, self.template, public, "/", manifest, search=search, **kwargs)
+        search.save()
+        with open(os.path.join(public, SEARCH_DIR_NAME, "index.json"), "r") as f:
+            meta = json.load(f)
+        return count, sorted(meta["docs"].values())
+
+    def test_every_build_path_indexes_the_same(self):
+        expected = [["", "Home"], ["big/", "Big"], ["roses/", "Roses"]]
+        for name, kwargs in (
+            ("serial", {}),
+            ("jobs", {"jobs": 2}),
+            ("streamed", {"stream_over": 1000}),
+            ("pipeline", {"pipeline": PipelineConfig()}),
+            ("pipeline_streamed", {"pipeline": PipelineConfig(), "stream_over": 1000}),
+        ):
+            public = os.path.join(self.tmp.name, name)
+            self.assertEqual(self.build(public, **kwargs), (3, expected), name)
+            with open(os.path.join(public, SEARCH_DIR_NAME, "terms", "tu.json"), "r") as f:
+                self.assertEqual(list(json.load(f).items())[0][1][1], 200, name)
+
+    def test_manifest_rebuilds_pages_for_a_new_index(self):
+        manifest_path = os.path.join(self.tmp.name, "manifest.json")
+        manifest = BuildManifest(manifest_path, public_dir=self.public)
+        self.assertEqual(self.build(self.public, manifest)[0], 3)
+        manifest.save()
+
+        manifest = BuildManifest.load(manifest_path, self.public)
+        self.assertEqual(self.build(self.public, manifest)[0], 0)
+
+        os.remove(self.public + ".json")
+        manifest = BuildManifest.load(manifest_path, self.public)
+        search = SearchIndex(self.public, self.public + ".json")
+        dest_path = os.path.join(self.public, "index.html")
+        entry = manifest.page_entry(os.path.join(self.content, "index.md"), self.template, "/", search=search.token)
+        self.assertEqual(manifest.stale_reasons(dest_path, entry), ["search index started over"])
+        entry = manifest.page_entry(os.path.join(self.content, "index.md"), self.template, "/")
+        self.assertEqual(manifest.stale_reasons(dest_path, entry), ["search index turned off"])
+
+
+class TestBenchSearch(unittest.TestCase):
+    def test_smoke(self):
+        results = run(pages=20, words=50, vocabulary_size=200, changed_fraction=0.1, prefix_length=2)
+        self.assertGreater(results["shards"], 0)
+        self.assertLessEqual(results["incremental_shards_rewritten"], results["shards"])
+        self.assertGreater(results["index_json_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import filecmp
+import os
+import shutil
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from fixtures import FileTreeMixin
+from gencontent import collect_pages, generate_pages_recursive
+from manifest import BuildManifest
+from shard import ShardError, merge_shards, parse_shard, partition, select_shard, shard_path
+
+
+def build_shard(content, template, shard_root, shard):
+    # one CI runner's share of the site
+    public = os.path.join(shard_path(shard_root, shard), "docs")
+    manifest = BuildManifest(os.path.join(shard_path(shard_root, shard), "manifest.json"), public_dir=public)
+    generate_pages_recursive(content, template, public, "/site/", manifest, shard=shard)
+    with open(os.path.join(public, "index.css"), "w") as f:
+        f.write("body {}")
+    manifest.save()
+
+
+class TestParseShard(unittest.TestCase):
+    def test_valid(self):
+        self.assertEqual(parse_shard("1/1"), (1, 1))
+        self.assertEqual(parse_shard("3/4"), (3, 4))
+
+    def test_invalid(self):
+        for text in ("0/4", "5/4", "1/0", "a/b", "2", ""):
+            with self.assertRaises(ValueError, msg=text):
+                parse_shard(text)
+
+
+class TestShardedBuild(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.shards = os.path.join(self.tmp.name, "shards")
+        for i in range(10):
+            self.write(
+                os.path.join(self.content, f"section{i % 3}", f"page{i}.md"),
+                f"# Page {i}\n\n" + "Some **bold** text.\n\n" * (i + 1),
+            )
+        self.write(self.template, '<title>{{ Title }}</title><link href="/index.css">{{ Content }}')
+
+    def pages(self):
+        return collect_pages(self.content, os.path.join(self.tmp.name, "out"))
+
+    def build_shards(self, count):
+        with ProcessPoolExecutor(max_workers=count) as executor:
+            futures = [
+                executor.submit(build_shard, self.content, self.template, self.shards, (index, count))
+                for index in range(1, count + 1)
+            ]
+            for future in futures:
+                future.result()
+
+    def test_partition_is_disjoint_complete_and_balanced(self):
+        pages = self.pages()
+        shards = partition(pages, 3, self.content)
+        self.assertEqual(sorted(page for shard in shards for page in shard), sorted(pages))
+        loads = [sum(os.path.getsize(from_path) for from_path, _ in shard) for shard in shards]
+        largest = max(os.path.getsize(from_path) for from_path, _ in pages)
+        self.assertLessEqual(max(loads) - min(loads), largest)
+
+    def test_partition_is_deterministic(self):
+        pages = self.pages()
+        self.assertEqual(partition(pages, 3, self.content), partition(list(reversed(pages)), 3, self.content))
+        # the split depends on content-relative paths, not where the checkout lives
+        moved = os.path.join(self.tmp.name, "elsewhere")
+        shutil.copytree(self.content, moved)
+        relative = [
+            [os.path.relpath(from_path, root) for from_path, _ in shard]
+            for root, pages in ((self.content, pages), (moved, collect_pages(moved, "out")))
+            for shard in partition(pages, 3, root)
+        ]
+        self.assertEqual(relative[:3], relative[3:])
+
+    def test_select_shard_keeps_original_order(self):
+        pages = self.pages()
+        selected = select_shard(pages, (2, 3), self.content)
+        self.assertEqual(selected, [page for page in pages if page in selected])
+        self.assertEqual(sorted(selected), sorted(partition(pages, 3, self.content)[1]))
+
+    def test_merged_shards_match_unsharded_build(self):
+        whole = os.path.join(self.tmp.name, "whole")
+        generate_pages_recursive(self.content, self.template, whole, "/site/")
+        self.write(os.path.join(whole, "index.css"), "body {}")
+        self.build_shards(3)
+
+        public = os.path.join(self.tmp.name, "docs")
+        merged, files = merge_shards(self.shards, public, os.path.join(self.tmp.name, "manifest.json"))
+        self.assertEqual(len(merged.pages), 10)
+        self.assertEqual(files, 11)
+        comparison = filecmp.dircmp(whole, public)
+        self.assertEqual(comparison.left_only + comparison.right_only + comparison.diff_files, [])
+        for section in comparison.subdirs.values():
+            self.assertEqual(section.left_only + section.right_only + section.diff_files, [])
+
+        # the merged manifest lets an unsharded build pick up where the shards left off
+        manifest = BuildManifest.load(os.path.join(self.tmp.name, "manifest.json"), public)
+        self.assertEqual(generate_pages_recursive(self.content, self.template, public, "/site/", manifest), 0)
+
+    def test_conflicting_files_are_rejected(self):
+        self.build_shards(2)
+        self.write(os.path.join(shard_path(self.shards, (2, 2)), "docs", "index.css"), "body { color: red }")
+        public = os.path.join(self.tmp.name, "docs")
+        with self.assertRaises(ShardError) as caught:
+            merge_shards(self.shards, public, os.path.join(self.tmp.name, "manifest.json"))
+        self.assertIn("index.css differs between shards 1 and 2", caught.exception.problems)
+        self.assertFalse(os.path.exists(public))
+
+    def test_missing_shard_is_rejected(self):
+        self.build_shards(3)
+        shutil.rmtree(shard_path(self.shards, (2, 3)))
+        with self.assertRaises(ShardError) as caught:
+            merge_shards(self.shards, os.path.join(self.tmp.name, "docs"), os.path.join(self.tmp.name, "m.json"))
+        self.assertEqual(caught.exception.problems, ["missing shard(s) 2 of 3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from htmlnode import markdown_to_html_node
+from template import Template, load_template
+from urls import UrlRewriter
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title> {{ Title }} </title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>body</p>"}),
+            "<title> Hi </title><article><p>body</p></article>",
+        )
+
+    def test_segments(self):
+        template = Template("a{{ One }}b{{Two}}c")
+        self.assertEqual(template.literals, ["a", "b", "c"])
+        self.assertEqual(template.names, ["One", "Two"])
+
+    def test_arbitrary_placeholders(self):
+        template = Template("{{ Title }} by {{ Author }} on {{ Date }}")
+        self.assertEqual(
+            template.render({"Title": "Post", "Author": "Tom", "Date": "today"}),
+            "Post by Tom on today",
+        )
+
+    def test_repeated_placeholder(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.render({"Title": "x"}), "x|x")
+
+    def test_unknown_placeholder_left_alone(self):
+        template = Template("{{ Title }} {{ Missing }}")
+        self.assertEqual(template.render({"Title": "x"}), "x {{ Missing }}")
+
+    def test_basepath_applied_to_literals(self):
+        template = Template('<link href="/index.css"><img src="/a.png">{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": ""}),
+            '<link href="/site/index.css"><img src="/site/a.png">',
+        )
+
+    def test_template_links_and_content_rewritten(self):
+        template = Template(
+            '<a href="/">home</a><a href="https://example.com/">x</a>{{ Content }}',
+            UrlRewriter("/site/", asset_prefix="https://cdn.example.com"),
+        )
+        content = markdown_to_html_node('![a](/a.png)\n\n```\n<a href="/code">\n```')
+        self.assertEqual(
+            template.render({"Content": content}),
+            '<a href="/site/">home</a><a href="https://example.com/">x</a>'
+            '<div><p><img src="https://cdn.example.com/a.png" alt="a"></p>'
+            '<pre><code><a href="/code">\n</code></pre></div>',
+        )
+
+    def test_load_template_is_cached(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Content }}")
+            self.assertIs(load_template(path), load_template(path))
+            self.assertIsNot(load_template(path), load_template(path, "/site/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,6 +24,11 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("Text one", TextType.BOLD_TEXT)
         node2 = TextNode("Text one", TextType.ITALIC_TEXT)
         self.assertNotEqual(node, node2)
+    def test_slots(self):
+        node = TextNode("Text", TextType.NORMAL_TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = 1
 
 
 
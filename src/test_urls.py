@@ -0,0 +1,55 @@
+import unittest
+
+from urls import UrlRewriter, as_url_rewriter, is_page_url
+
+
+class TestUrlRewriter(unittest.TestCase):
+    def test_basepath(self):
+        urls = UrlRewriter("/site/")
+        self.assertEqual(urls.rewrite("href", "/blog/post"), "/site/blog/post")
+        self.assertEqual(urls.rewrite("src", "/images/a.png"), "/site/images/a.png")
+        self.assertEqual(urls.rewrite("href", "/"), "/site/")
+
+    def test_leaves_other_urls_alone(self):
+        urls = UrlRewriter("/site/", "https://example.com", "https://cdn.example.com")
+        for url in ["https://other.com/a.png", "//cdn.other.com/a.png", "relative.html", "#top", "mailto:x@y.z"]:
+            self.assertEqual(urls.rewrite("src", url), url)
+
+    def test_site_url(self):
+        urls = UrlRewriter("/site/", "https://example.com/")
+        self.assertEqual(urls.rewrite("href", "/blog/post"), "https://example.com/site/blog/post")
+        self.assertEqual(urls.rewrite("src", "/a.png"), "https://example.com/site/a.png")
+
+    def test_asset_prefix(self):
+        urls = UrlRewriter("/site/", "https://example.com", "https://cdn.example.com")
+        self.assertEqual(urls.rewrite("src", "/images/a.png"), "https://cdn.example.com/images/a.png")
+        self.assertEqual(urls.rewrite("href", "/index.css?v=2"), "https://cdn.example.com/index.css?v=2")
+        self.assertEqual(urls.rewrite("href", "/blog/post"), "https://example.com/site/blog/post")
+        self.assertEqual(urls.rewrite("href", "/blog/post.html#top"), "https://example.com/site/blog/post.html#top")
+
+    def test_fingerprints(self):
+        urls = UrlRewriter("/site/", asset_prefix="https://cdn.example.com", fingerprints={"/a.png": "/a.0123456789.png"})
+        self.assertEqual(urls.rewrite("src", "/a.png?x=1"), "https://cdn.example.com/a.0123456789.png?x=1")
+        self.assertEqual(urls.rewrite("src", "/b.png"), "https://cdn.example.com/b.png")
+        self.assertTrue(UrlRewriter(fingerprints={"/a.png": "/a.0123456789.png"}).active)
+        self.assertNotEqual(urls, UrlRewriter("/site/", asset_prefix="https://cdn.example.com"))
+
+    def test_active(self):
+        self.assertFalse(UrlRewriter().active)
+        self.assertTrue(UrlRewriter("/site/").active)
+        self.assertTrue(UrlRewriter("/", asset_prefix="https://cdn.example.com").active)
+
+    def test_as_url_rewriter(self):
+        self.assertEqual(as_url_rewriter("/site/"), UrlRewriter("/site/"))
+        self.assertIsNone(as_url_rewriter(None))
+        self.assertNotEqual(UrlRewriter("/site/"), UrlRewriter("/site/", "https://example.com"))
+
+    def test_is_page_url(self):
+        self.assertTrue(is_page_url("/blog/post"))
+        self.assertTrue(is_page_url("/blog/"))
+        self.assertTrue(is_page_url("/index.html"))
+        self.assertFalse(is_page_url("/files/doc.pdf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+from fixtures import FileTreeMixin
+from walk import DEFAULT_IGNORES, IgnoreRules, load_ignore_rules, walk_files
+
+
+class TestIgnoreRules(unittest.TestCase):
+    def excluded(self, patterns, rel_path, is_dir=False):
+        return IgnoreRules(patterns).excludes(rel_path, is_dir)
+
+    def test_name_matches_at_any_depth(self):
+        self.assertTrue(self.excluded(["*.swp"], "a.md.swp"))
+        self.assertTrue(self.excluded(["*.swp"], "blog/post/.a.md.swp"))
+        self.assertFalse(self.excluded(["*.swp"], "a.md"))
+
+    def test_slash_anchors_to_root(self):
+        self.assertTrue(self.excluded(["/drafts"], "drafts", is_dir=True))
+        self.assertFalse(self.excluded(["/drafts"], "blog/drafts", is_dir=True))
+        self.assertTrue(self.excluded(["blog/*.md"], "blog/a.md"))
+        self.assertFalse(self.excluded(["blog/*.md"], "blog/2024/a.md"))
+        self.assertFalse(self.excluded(["blog/*.md"], "x/blog/a.md"))
+
+    def test_double_star(self):
+        self.assertTrue(self.excluded(["blog/**/draft-*"], "blog/draft-1.md"))
+        self.assertTrue(self.excluded(["blog/**/draft-*"], "blog/2024/05/draft-1.md"))
+        self.assertTrue(self.excluded(["**/tmp"], "a/b/tmp", is_dir=True))
+        self.assertTrue(self.excluded(["notes/**"], "notes/a/b.md"))
+        self.assertFalse(self.excluded(["notes/**"], "notes", is_dir=True))
+
+    def test_trailing_slash_only_matches_directories(self):
+        self.assertTrue(self.excluded(["drafts/"], "blog/drafts", is_dir=True))
+        self.assertFalse(self.excluded(["drafts/"], "blog/drafts"))
+
+    def test_negation_last_match_wins(self):
+        patterns = ["*.md", "!keep.md"]
+        self.assertTrue(self.excluded(patterns, "a.md"))
+        self.assertFalse(self.excluded(patterns, "keep.md"))
+        self.assertTrue(self.excluded(patterns + ["keep.md"], "keep.md"))
+
+    def test_character_classes_and_escapes(self):
+        self.assertTrue(self.excluded(["page[0-9].md"], "page3.md"))
+        self.assertFalse(self.excluded(["page[!0-9].md"], "page3.md"))
+        self.assertTrue(self.excluded(["\\#notes"], "#notes"))
+        self.assertTrue(self.excluded(["\\!important"], "!important"))
+        self.assertTrue(self.excluded(["a?c"], "abc"))
+        self.assertFalse(self.excluded(["a?c"], "a/c"))
+
+    def test_comments_and_blank_lines(self):
+        rules = IgnoreRules(["# drafts", "", "   ", "*.tmp  "])
+        self.assertEqual(rules.patterns, ["*.tmp"])
+        self.assertTrue(rules.excludes("a.tmp"))
+
+    def test_defaults(self):
+        rules = IgnoreRules(DEFAULT_IGNORES)
+        for junk in ("tom.png:Zone.Identifier", ".index.md.swp", "index.md~", ".#index.md", "#index.md#", ".DS_Store"):
+            self.assertTrue(rules.excludes(junk), junk)
+        for keep in ("index.md", ".well-known", "images/tom.png"):
+            self.assertFalse(rules.excludes(keep), keep)
+
+    def test_load_ignore_rules(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, ".ssgignore")
+            with open(path, "w") as f:
+                f.write("# drafts live here\ndrafts/\n!*.swp\n")
+            rules = load_ignore_rules(path, ["*.bak"])
+        self.assertTrue(rules.excludes("drafts", is_dir=True))
+        self.assertTrue(rules.excludes("a.bak"))
+        self.assertFalse(rules.excludes("a.swp"))
+        self.assertTrue(load_ignore_rules(path).excludes("a.swp"))
+
+
+class TestWalkFiles(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.root = self.tmp.name
+        for rel_path in (
+            "index.md", "b/z.md", "b/a.md", "a-b.md", "a/c.md", "drafts/x.md", "blog/drafts/y.md",
+            "tom.png:Zone.Identifier", "blog/.post.md.swp",
+        ):
+            self.write(os.path.join(self.root, rel_path), "x")
+
+    def test_sorted_without_rules(self):
+        files = walk_files(self.root)
+        self.assertEqual(len(files), 9)
+        # directory by directory, so a/ comes before a-b.md
+        self.assertEqual(files[:3], [os.path.join("a", "c.md"), "a-b.md", os.path.join("b", "a.md")])
+
+    def test_filtered(self):
+        rules = IgnoreRules(DEFAULT_IGNORES + ("/drafts/",))
+        self.assertEqual(
+            walk_files(self.root, rules),
+            [os.path.join("a", "c.md"), "a-b.md", os.path.join("b", "a.md"), os.path.join("b", "z.md"),
+             os.path.join("blog", "drafts", "y.md"), "index.md"],
+        )
+
+    def test_excluded_directories_are_not_entered(self):
+        # like git, a file under an excluded directory cannot be re-included
+        rules = IgnoreRules(["drafts/", "!x.md"])
+        self.assertNotIn(os.path.join("drafts", "x.md"), walk_files(self.root, rules))
+        opened = []
+        original = os.scandir
+
+        def scandir(path):
+            opened.append(os.path.relpath(path, self.root))
+            return original(path)
+
+        os.scandir = scandir
+        try:
+            walk_files(self.root, rules)
+        finally:
+            os.scandir = original
+        self.assertEqual(sorted(opened), [".", "a", "b", "blog"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+import os
+import threading
+import unittest
+
+from copystatic import copy_file
+from feeds import PageMetadata
+from fixtures import FileTreeMixin
+from gencontent import generate_pages_recursive
+from manifest import BuildManifest
+from watch import LiveReload, SiteWatcher, inject_reload_script
+
+
+class TestSiteWatcher(FileTreeMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\ntext")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.manifest = BuildManifest(os.path.join(root, "manifest.json"))
+        generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest)
+        self.watcher = SiteWatcher(self.content, self.static, self.template, self.public, "/", self.manifest)
+
+    def write(self, path, text):
+        super().write(path, text)
+        # make sure the change is visible even on coarse mtime filesystems
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), ([], []))
+
+    def test_markdown_change_regenerates_one_page(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello again")
+        actions = self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(actions, [f"regenerated {os.path.join(self.content, 'index.md')}"])
+        self.assertIn("hello again", self.read(os.path.join(self.public, "index.html")))
+
+    def test_template_change_regenerates_everything(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        actions = self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(actions, ["template changed, regenerated 2 page(s)"])
+        self.assertTrue(self.read(os.path.join(self.public, "blog", "post.html")).startswith("<h1>Post</h1>"))
+
+    def test_static_change_copies_one_file(self):
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        actions = self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(actions, [f"copied {os.path.join(self.static, 'index.css')}"])
+        self.assertEqual(self.read(os.path.join(self.public, "index.css")), "body { margin: 0 }")
+
+    def test_removed_page(self):
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+
+    def test_failed_page_does_not_stop_the_batch(self):
+        index_html = os.path.join(self.public, "index.html")
+        self.manifest.save()
+        before = BuildManifest.load(self.manifest.path).pages[index_html]["source_hash"]
+        broken = os.path.join(self.content, "blog", "post.md")
+        self.write(broken, "no title")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nhello again")
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        actions = self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual([path for path, _ in self.watcher.failures], [broken])
+        self.assertIn(f"regenerated {os.path.join(self.content, 'index.md')}", actions)
+        self.assertIn(f"copied {os.path.join(self.static, 'index.css')}", actions)
+        self.assertIn("hello again", self.read(index_html))
+        # the manifest was saved with the page that did build
+        self.assertNotEqual(BuildManifest.load(self.manifest.path).pages[index_html]["source_hash"], before)
+
+        self.write(broken, "# Post\n\nfixed")
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertEqual(self.watcher.failures, [])
+
+    def test_batch_build_after_watch_rebuilds_nothing(self):
+        # main.py passes "./"-relative paths, which the watcher normalizes
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp.name)
+        manifest = BuildManifest("manifest.json", public_dir="./docs")
+        generate_pages_recursive("./content", "./template.html", "./docs", "/", manifest)
+        watcher = SiteWatcher("./content", "./static", "./template.html", "./docs", "/", manifest)
+        self.write("./template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.write(os.path.join("content", "index.md"), "# Home\n\nhello again")
+        watcher.rebuild(*watcher.poll())
+        manifest.reset()
+        self.assertEqual(generate_pages_recursive("./content", "./template.html", "./docs", "/", manifest), 0)
+
+    def test_page_and_its_image_changed_in_one_poll(self):
+        manifest = BuildManifest(self.manifest.path, public_dir=self.public)
+        self.write(os.path.join(self.static, "a.png"), "old")
+        copy_file(os.path.join(self.static, "a.png"), os.path.join(self.public, "a.png"))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png)")
+        generate_pages_recursive(self.content, self.template, self.public, "/", manifest)
+        watcher = SiteWatcher(self.content, self.static, self.template, self.public, "/", manifest)
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n![a](/a.png) again")
+        self.write(os.path.join(self.static, "a.png"), "a new image")
+        actions = watcher.rebuild(*watcher.poll())
+        self.assertEqual(actions.count(f"regenerated {os.path.join(self.content, 'index.md')}"), 1)
+        stat = os.stat(os.path.join(self.public, "a.png"))
+        entry = manifest.pages[os.path.join(self.public, "index.html")]
+        self.assertEqual(entry["assets"]["/a.png"], [stat.st_size, stat.st_mtime_ns])
+        manifest.reset()
+        self.assertEqual(generate_pages_recursive(self.content, self.template, self.public, "/", manifest), 0)
+
+    def test_blog_index_follows_post_changes(self):
+        metadata = PageMetadata(self.public, os.path.join(self.tmp.name, "pages.json"))
+        generate_pages_recursive(self.content, self.template, self.public, "/", self.manifest, metadata=metadata)
+        self.watcher.metadata = metadata
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Renamed post\n\ntext")
+        actions = self.watcher.rebuild(*self.watcher.poll())
+        self.assertIn("wrote blog/index.html", actions)
+        self.assertIn("Renamed post", self.read(os.path.join(self.public, "blog", "index.html")))
+
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.watcher.rebuild(*self.watcher.poll())
+        self.assertNotIn("Renamed post", self.read(os.path.join(self.public, "blog", "index.html")))
+
+
+class TestLiveReload(unittest.TestCase):
+    def test_wait_returns_on_notify(self):
+        live_reload = LiveReload()
+        thread = threading.Timer(0.01, live_reload.notify)
+        thread.start()
+        self.assertEqual(live_reload.wait(0, timeout=5), 1)
+        thread.join()
+
+    def test_wait_times_out(self):
+        self.assertEqual(LiveReload().wait(0, timeout=0.01), 0)
+
+    def test_inject_reload_script(self):
+        html = inject_reload_script("<body><p>x</p></body>")
+        self.assertTrue(html.startswith("<body><p>x</p><script>"))
+        self.assertTrue(html.endswith("</script></body>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+def is_page_url(url):
+    # links to other pages rather than to files: directories, .html and extensionless paths
+    return url.endswith(".html") or url.endswith("/") or "." not in url.rsplit("/", 1)[-1]
+
+
+def split_url(url):
+    # "/a.css?v=1#x" -> ("/a.css", "?v=1#x")
+    end = len(url)
+    for mark in "?#":
+        index = url.find(mark)
+        if index != -1:
+            end = min(end, index)
+    return url[:end], url[end:]
+
+
+class UrlRewriter:
+    # Rewrites root-relative href/src values as pages are rendered:
+    #   /a/b.css -> {site_url}{basepath}a/b.css
+    # and, with an asset prefix such as a CDN, every src plus hrefs to non-page files:
+    #   /a/b.css -> {asset_prefix}a/b.css
+    # Other urls (relative, absolute, protocol-relative, fragments) are left alone.
+    # `fingerprints` maps asset urls to their content-hashed names, applied first.
+    def __init__(self, basepath="/", site_url="", asset_prefix="", fingerprints=None):
+        self.basepath = basepath
+        self.site_url = site_url.rstrip("/") if site_url else ""
+        self.asset_prefix = asset_prefix.rstrip("/") + "/" if asset_prefix else ""
+        self.fingerprints = fingerprints or {}
+        self.prefix = self.site_url + basepath
+        # compared on every load_template call, so built once
+        self.key = (self.basepath, self.site_url, self.asset_prefix, tuple(sorted(self.fingerprints.items())))
+
+    @property
+    def active(self):
+        # whether rendering through this rewriter changes anything at all
+        return self.prefix != "/" or self.asset_prefix != "" or bool(self.fingerprints)
+
+    def rewrite(self, name, url):
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        path, suffix = split_url(url)
+        if self.fingerprints:
+            path = self.fingerprints.get(path, path)
+        if self.asset_prefix and (name == "src" or not is_page_url(path)):
+            return self.asset_prefix + path[1:] + suffix
+        return self.prefix + path[1:] + suffix
+
+    def __eq__(self, other):
+        return isinstance(other, UrlRewriter) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"UrlRewriter(basepath={self.basepath!r}, site_url={self.site_url!r}, asset_prefix={self.asset_prefix!r})"
+
+
+def as_url_rewriter(urls):
+    # most callers just have a basepath string
+    if urls is None or isinstance(urls, UrlRewriter):
+        return urls
+    return UrlRewriter(urls)
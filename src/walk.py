@@ -0,0 +1,137 @@
+import os
+import re
+
+
+# editor droppings and OS metadata that never belong in the site
+DEFAULT_IGNORES = (
+    "*:Zone.Identifier",
+    ".DS_Store",
+    "Thumbs.db",
+    "desktop.ini",
+    "*~",
+    "*.swp",
+    "*.swo",
+    "*.swx",
+    ".#*",
+    r"\#*#",
+)
+
+
+def translate(pattern):
+    # gitignore glob -> regex source: "*" and "?" stop at "/", "**" crosses directories
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and (end := pattern.find("]", i + 2)) != -1:
+            body = pattern[i + 1:end]
+            if body[0] in "!^":
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    # Exclude patterns with .gitignore semantics, matched against "/"-separated paths
+    # relative to the walked directory:
+    #   name      a file or directory with that name at any depth
+    #   a/b, /a   anchored to the top of the walked directory
+    #   dir/      directories only
+    #   !pattern  re-includes what an earlier pattern excluded
+    # The last matching pattern wins; files under an excluded directory stay excluded.
+    def __init__(self, patterns=()):
+        self.patterns = []
+        self.rules = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern):
+        pattern = pattern.rstrip("\n")
+        if not pattern.endswith("\\ "):
+            pattern = pattern.rstrip()
+        if not pattern or pattern.startswith("#"):
+            return
+        self.patterns.append(pattern)
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if "/" in pattern:
+            regex = translate(pattern.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + translate(pattern)
+        self.rules.append((re.compile(regex, re.S), negate, dir_only))
+
+    def excludes(self, rel_path, is_dir=False):
+        excluded = False
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if excluded == negate and regex.fullmatch(rel_path):
+                excluded = not negate
+        return excluded
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def __repr__(self):
+        return f"IgnoreRules({self.patterns!r})"
+
+
+def load_ignore_rules(path, extra=()):
+    # DEFAULT_IGNORES, then the patterns in `path` (if it exists), then `extra`
+    rules = IgnoreRules(DEFAULT_IGNORES)
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                rules.add(line)
+    except FileNotFoundError:
+        pass
+    for pattern in extra:
+        rules.add(pattern)
+    return rules
+
+
+def walk_files(root, ignore=None):
+    # Paths of the files under root, relative to it, sorted and minus anything `ignore`
+    # excludes. One scandir per directory: its entries already say which are directories,
+    # so files cost no extra stat, and excluded directories are never opened.
+    files = []
+    _walk(root, "", "", ignore, files)
+    return files
+
+
+def _walk(dir_path, rel_dir, match_dir, ignore, files):
+    with os.scandir(dir_path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    for entry in entries:
+        is_dir = entry.is_dir()
+        match_path = match_dir + entry.name
+        if ignore and ignore.excludes(match_path, is_dir):
+            continue
+        rel_path = rel_dir + entry.name
+        if is_dir:
+            _walk(entry.path, rel_path + os.sep, match_path + "/", ignore, files)
+        else:
+            files.append(rel_path)
@@ -0,0 +1,267 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from copystatic import copy_file, list_files
+from depgraph import DependencyGraph
+from feeds import DEFAULT_PER_PAGE, write_aggregates
+from gencontent import PageBuildError, generate_page, generate_pages_recursive
+
+
+RELOAD_PATH = "/__reload"
+RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + RELOAD_PATH + "\").onmessage = function () { location.reload(); };</script>"
+)
+
+
+class LiveReload:
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+def inject_reload_script(html):
+    index = html.rfind("</body>")
+    if index == -1:
+        return html + RELOAD_SCRIPT
+    return html[:index] + RELOAD_SCRIPT + html[index:]
+
+
+class ReloadingHandler(SimpleHTTPRequestHandler):
+    # serves the public directory, adding the reload script to every html page
+    def __init__(self, *args, live_reload=None, **kwargs):
+        self.live_reload = live_reload
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        if not path.endswith(".html") or not os.path.isfile(path):
+            super().do_GET()
+            return
+        with open(path, "r") as f:
+            body = inject_reload_script(f.read()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_reload_events(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        version = self.live_reload.version
+        try:
+            while True:
+                current = self.live_reload.wait(version, timeout=15)
+                if current != version:
+                    version = current
+                    self.wfile.write(b"data: reload\n\n")
+                else:
+                    self.wfile.write(b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(public_dir, port, live_reload):
+    handler = partial(ReloadingHandler, directory=public_dir, live_reload=live_reload)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+class SiteWatcher:
+    def __init__(
+        self, content_dir, static_dir, template_path, public_dir, basepath, manifest, cache=None, minify=False,
+        images=None, stream_over=None, ignore=None, search=None, metadata=None, per_page=DEFAULT_PER_PAGE,
+    ):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = os.path.normpath(template_path)
+        self.public_dir = public_dir
+        self.basepath = basepath
+        self.manifest = manifest
+        self.cache = cache
+        self.minify = minify
+        self.images = images
+        self.stream_over = stream_over
+        self.ignore = ignore
+        self.search = search
+        self.metadata = metadata
+        self.per_page = per_page
+        # (path, error) for what the last rebuild could not do
+        self.failures = []
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        paths = [self.template_path]
+        paths += [os.path.join(self.content_dir, rel_path) for rel_path in list_files(self.content_dir, self.ignore)]
+        paths += [os.path.join(self.static_dir, rel_path) for rel_path in list_files(self.static_dir, self.ignore)]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[os.path.normpath(path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self):
+        # returns the paths changed and removed since the last poll
+        snapshot = self.take_snapshot()
+        changed = sorted(path for path, stat in snapshot.items() if self.snapshot.get(path) != stat)
+        removed = sorted(set(self.snapshot) - set(snapshot))
+        self.snapshot = snapshot
+        return changed, removed
+
+    def page_dest_path(self, from_path):
+        rel_path = os.path.relpath(from_path, self.content_dir)
+        return Path(os.path.join(self.public_dir, rel_path)).with_suffix(".html")
+
+    def static_dest_path(self, from_path):
+        return os.path.join(self.public_dir, os.path.relpath(from_path, self.static_dir))
+
+    def is_under(self, path, dir_path):
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(dir_path)]) == os.path.abspath(dir_path)
+
+    def rebuild(self, changed, removed):
+        # A path that fails is reported in self.failures and the rest of the batch still
+        # goes ahead, so one broken page never holds back other changes or the saves below.
+        self.manifest.reset()
+        self.failures = []
+        actions = []
+        if self.template_path in changed:
+            try:
+                generated = generate_pages_recursive(
+                    self.content_dir, self.template_path, self.public_dir, self.basepath, self.manifest,
+                    cache=self.cache, minify=self.minify, images=self.images, stream_over=self.stream_over,
+                    ignore=self.ignore, search=self.search, metadata=self.metadata,
+                )
+                actions.append(f"template changed, regenerated {generated} page(s)")
+            except PageBuildError as e:
+                # the other pages were still regenerated
+                actions.append("template changed, regenerated the pages")
+                self.failures += [(str(path), error) for path, error in e.failures]
+            changed = [path for path in changed if not self.is_under(path, self.content_dir)]
+
+        # static files go first, so pages changed in the same batch link to the new copies
+        for path in sorted(changed, key=lambda path: not self.is_under(path, self.static_dir)):
+            if path != self.template_path:
+                self.attempt(path, self.apply_change, path, actions)
+        for path in removed:
+            self.attempt(path, self.apply_removal, path, actions)
+
+        self.manifest.assets = list_files(self.static_dir, self.ignore)
+        self.manifest.save()
+        if self.images is not None:
+            self.images.save()
+        if self.search is not None:
+            self.search.save()
+        if self.metadata is not None:
+            # the blog index, feed and sitemap come from the metadata alone, so they are cheap to redo
+            aggregates = write_aggregates(self.metadata, self.template_path, self.basepath, self.per_page, self.minify)
+            actions += [f"wrote {rel_path}" for rel_path in aggregates.written]
+            actions += [f"removed {rel_path}" for rel_path in aggregates.removed]
+            self.metadata.save()
+        return actions
+
+    def attempt(self, path, action, *args):
+        try:
+            action(*args)
+        except Exception as e:
+            self.failures.append((path, f"{type(e).__name__}: {e}"))
+
+    def apply_change(self, path, actions):
+        if self.is_under(path, self.content_dir):
+            self.regenerate(path, actions)
+        elif self.is_under(path, self.static_dir):
+            copy_file(path, self.static_dest_path(path))
+            actions.append(f"copied {path}")
+            self.regenerate_dependents(path, actions)
+
+    def apply_removal(self, path, actions):
+        if self.is_under(path, self.content_dir):
+            dest_path = self.page_dest_path(path)
+            self.manifest.forget(dest_path)
+            if self.search is not None:
+                self.search.remove(dest_path)
+            if self.metadata is not None:
+                self.metadata.remove(dest_path)
+        elif self.is_under(path, self.static_dir):
+            dest_path = self.static_dest_path(path)
+        else:
+            return
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        actions.append(f"removed {dest_path}")
+        if self.is_under(path, self.static_dir):
+            self.regenerate_dependents(path, actions)
+
+    def regenerate(self, from_path, actions):
+        dest_path = self.page_dest_path(from_path)
+        result = generate_page(
+            from_path, self.template_path, dest_path, self.basepath, self.manifest,
+            cache=self.cache, minify=self.minify, images=self.images, stream_over=self.stream_over,
+            search=self.search.token if self.search is not None else None,
+        )
+        if result is not None:
+            actions.append(f"regenerated {from_path}")
+            if "search" in result:
+                self.search.add(dest_path, *result["search"])
+            if self.metadata is not None:
+                self.metadata.update(dest_path, from_path, result["meta"])
+
+    def regenerate_dependents(self, static_path, actions):
+        # pages that reference a static file are rebuilt along with it
+        url = "/" + os.path.relpath(static_path, self.static_dir).replace(os.sep, "/")
+        self.manifest.forget_stamp(url)
+        graph = DependencyGraph.from_manifest(self.manifest)
+        for dest_path in graph.invalidated_by(("asset", url)):
+            self.regenerate(self.manifest.pages[dest_path]["source"], actions)
+
+    def run(self, live_reload, interval=0.1):
+        while True:
+            time.sleep(interval)
+            changed, removed = self.poll()
+            if not changed and not removed:
+                continue
+            start = time.perf_counter()
+            try:
+                actions = self.rebuild(changed, removed)
+            except Exception as e:
+                print(f" ! rebuild failed: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            for action in actions:
+                print(f" * {action}")
+            for path, error in self.failures:
+                print(f" ! {path}: {error}")
+            print(f"Rebuilt in {elapsed:.1f} ms")
+            if actions:
+                live_reload.notify()